@@ -0,0 +1,224 @@
+import json
+import math
+import queue
+import threading
+
+import requests
+
+from rolling_stats import RollingWindow
+
+
+# --- Rules -----------------------------------------------------------------
+
+class Rule:
+    """
+    Base alert rule. Each rule turns a probe reading into one metric and compares it against an
+    upper ('above') or lower ('below') limit. Hysteresis keeps a noisy reading that hovers around
+    the limit from flapping: once triggered, the metric has to move back past the limit by
+    `hysteresis` before the alert clears.
+    """
+
+    kind = 'rule'
+    unit = '°C'
+
+    def __init__(self, name, probe, above=None, below=None, hysteresis=0.0):
+        if (above is None) == (below is None):
+            raise ValueError(f"Alert rule '{name}' needs exactly one of 'above' or 'below'")
+        self.name = name
+        self.probe = probe
+        self.above = above
+        self.below = below
+        self.hysteresis = hysteresis
+        self.active = False
+
+    def metric(self, epoch, value):
+        raise NotImplementedError
+
+    def update(self, epoch, value):
+        """Feed one reading, return an event dict when the alert state changes."""
+        metric = self.metric(epoch, value)
+        if metric is None:
+            return None
+
+        if self.above is not None:
+            triggered = metric >= self.above if not self.active else metric > self.above - self.hysteresis
+        else:
+            triggered = metric <= self.below if not self.active else metric < self.below + self.hysteresis
+
+        if triggered == self.active:
+            return None
+        self.active = triggered
+
+        limit = f"above {self.above}" if self.above is not None else f"below {self.below}"
+        state = 'triggered' if triggered else 'cleared'
+        return {
+            'time': epoch,
+            'rule': self.name,
+            'kind': self.kind,
+            'probe': self.probe,
+            'state': state,
+            'value': round(metric, 2),
+            'message': f"{self.name}: {self.probe} {self.kind} {metric:.1f}{self.unit} ({state}, limit {limit}{self.unit})",
+        }
+
+
+class ThresholdRule(Rule):
+    """Probe temperature crosses a fixed limit, e.g. meat done or smoker too hot."""
+
+    kind = 'temperature'
+
+    def metric(self, epoch, value):
+        return value
+
+
+class RateRule(Rule):
+    """Temperature rises/falls faster than a limit (°C per minute), e.g. fire going out."""
+
+    kind = 'rate'
+    unit = '°C/min'
+
+    def __init__(self, name, probe, window_seconds=60, **limits):
+        super().__init__(name, probe, **limits)
+        self.window = RollingWindow(window_seconds)
+
+    def metric(self, epoch, value):
+        self.window.add(epoch, value)
+        # Wait until the window is mostly filled, a slope over a few samples is just noise
+        if self.window.span() < 0.8 * self.window.window_seconds:
+            return None
+        slope = self.window.slope()
+        return slope * 60 if slope is not None else None
+
+
+class DeviationRule(Rule):
+    """
+    Temperature drifts more than a limit away from a target, in either direction.
+    Only armed once the probe has first come within range, so the preheat doesn't trigger it.
+    """
+
+    kind = 'deviation'
+
+    def __init__(self, name, probe, target, max_deviation, hysteresis=0.0):
+        super().__init__(name, probe, above=max_deviation, hysteresis=hysteresis)
+        self.target = target
+        self.armed = False
+
+    def metric(self, epoch, value):
+        deviation = abs(value - self.target)
+        self.armed = self.armed or deviation < self.above
+        return deviation if self.armed else None
+
+
+# --- Sinks -----------------------------------------------------------------
+
+class LogSink:
+    """Print events, the recorder's stdout ends up in the systemd journal."""
+
+    def send(self, event):
+        print(f"ALERT {event['message']}", flush=True)
+
+
+class FileSink:
+    """Append events to a newline-delimited JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, event):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event) + '\n')
+
+
+class WebhookSink:
+    """
+    POST events as JSON to a (local) webhook. Requests run on a background thread so a slow
+    or unreachable endpoint never delays the next sample.
+    """
+
+    def __init__(self, url, timeout=2.0, max_queue=100):
+        self.url = url
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def send(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            print(f"Webhook queue full, dropping alert: {event['message']}")
+
+    def _worker(self):
+        while True:
+            event = self.queue.get()
+            try:
+                self.session.post(self.url, json=event, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Webhook alert failed: {e}")
+
+
+# --- Engine ----------------------------------------------------------------
+
+class AlertEngine:
+    """Runs every rule on each incoming sample and dispatches state changes to all sinks."""
+
+    def __init__(self, rules, sinks):
+        self.rules = rules
+        self.sinks = sinks
+
+    def process(self, epoch, sample):
+        """
+        Args:
+            epoch: sample time (unix seconds)
+            sample: dict of probe name -> temperature, e.g. {'smoker': 121.5, 'meat': 63.2}
+
+        Returns:
+            list of events emitted for this sample
+        """
+        events = []
+        for rule in self.rules:
+            value = sample.get(rule.probe)
+            if value is None or math.isnan(value):
+                continue
+            event = rule.update(epoch, value)
+            if event:
+                events.append(event)
+
+        for event in events:
+            self.dispatch(event)
+        return events
+
+    def dispatch(self, event):
+        for sink in self.sinks:
+            try:
+                sink.send(event)
+            except Exception as e:
+                print(f"Alert sink {type(sink).__name__} failed: {e}")
+
+
+RULE_TYPES = {'threshold': ThresholdRule, 'rate': RateRule, 'deviation': DeviationRule}
+SINK_TYPES = {'log': LogSink, 'file': FileSink, 'webhook': WebhookSink}
+PROBE_TARGETS = {'smoker': 'smoker_target', 'meat': 'meat_minimum'}
+
+
+def build_alert_engine(config):
+    """Create an AlertEngine from the 'alerts' section of defaults.yaml (None if disabled)."""
+    alert_config = config.get('alerts') or {}
+    if not alert_config.get('enabled'):
+        return None
+
+    rules = []
+    for rule_config in alert_config.get('rules', []):
+        options = dict(rule_config)
+        rule_type = options.pop('type')
+        if rule_type == 'deviation' and 'target' not in options:
+            # Default to the dashboard's target temperature for that probe
+            options['target'] = config['temperatures'][PROBE_TARGETS[options['probe']]]
+        rules.append(RULE_TYPES[rule_type](**options))
+
+    sinks = []
+    for sink_config in alert_config.get('sinks', [{'type': 'log'}]):
+        options = dict(sink_config)
+        sinks.append(SINK_TYPES[options.pop('type')](**options))
+
+    return AlertEngine(rules, sinks)
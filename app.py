@@ -1,26 +1,98 @@
-from dash import Dash, html, dcc, callback, Output, Input
+from dash import Dash, html, dcc, callback, clientside_callback, ClientsideFunction, ctx, Output, Input, State
+from dash.exceptions import PreventUpdate
 import plotly.graph_objs as go
 import numpy as np
 import pandas as pd
-import yaml
-import os
-from helpers import convert_to_time, forecast_temperature, enhanced_forecast_temperature, parse_temperature_data
-
-# Load configuration defaults
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), 'defaults.yaml')
-    with open(config_path, 'r') as file:
-        return yaml.safe_load(file)
+import hashlib
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from config import load_config
+from helpers import convert_to_time, forecast_temperature, enhanced_forecast_temperature, parse_temperature_data, latest_sample_epoch, device_folders
+from serving import enable_compression, asset_url, add_asset_cache_headers
+from cook_phase import read_state_file
+from telemetry import read_status_file
+from history import HistoryCache
+from metrics import MemorySampler, register_metrics
+from export import register_export
+from ingest import IngestWriter, register_ingest
+from temperature_forecast import KalmanTrendFilter
+from snapshot import SnapshotCache, register_snapshot
 
 config = load_config()
 
 
-app = Dash(__name__, assets_folder='assets', external_stylesheets=['/assets/styles.css'])
+# CSS and JS files in assets/ are picked up automatically (with a ?m= cache-busting suffix)
+app = Dash(__name__, assets_folder='assets')
 app.title = 'PiBQ - BBQ monitoring dashboard'
 
 # Add custom favicon
 app._favicon = 'favicon.png'
 
+# WSGI entry point for production serving: gunicorn -c gunicorn.conf.py app:server
+server = app.server
+if config['server']['compression']:
+    enable_compression(server, config['server']['compression'])
+add_asset_cache_headers(app, config['server']['asset_max_age'])
+
+# Session data stays in memory between refreshes, within a budget (per worker process)
+memory_config = config['memory']
+history = HistoryCache(memory_config['history_budget_mb'], memory_config['rollup_seconds'],
+                       memory_config['max_rollup_seconds'])
+memory_sampler = MemorySampler(memory_config['sample_interval_seconds'],
+                               tracemalloc_frames=memory_config['tracemalloc_frames'])
+metrics_sources = {'history': history.stats}
+register_metrics(server, memory_sampler, metrics_sources)
+
+# Raw data download: /export?start=...&end=...&probes=meat&format=csv&every=60
+register_export(server, './temperature/', config['session']['utc_offset'])
+
+# Other PiBQ units push their samples here (record_temp.py --push), stored in temperature/<device>/
+ingest_config = config['ingest']
+if ingest_config['enabled']:
+    ingest_writer = IngestWriter('./temperature/', ingest_config['max_pending_rows'], ingest_config['flush_interval_seconds'])
+    register_ingest(server, ingest_writer, ingest_config.get('token'), ingest_config['retry_after_seconds'])
+    metrics_sources['ingest'] = ingest_writer.stats
+
+# One Kalman filter per unit and probe, kept between refreshes so only new samples are filtered
+kalman_config = config['forecast']['kalman']
+kalman_filters = OrderedDict()
+kalman_lock = threading.Lock()
+MAX_KALMAN_FILTERS = 16
+
+def kalman_filter(folder_path, probe, previous_days):
+    key = (folder_path, probe, previous_days)
+    with kalman_lock:
+        if key not in kalman_filters:
+            kalman_filters[key] = KalmanTrendFilter(kalman_config[probe]['measurement_noise'],
+                                                    kalman_config[probe]['acceleration_noise'],
+                                                    config['recorder']['sample_period_seconds'],
+                                                    kalman_config['band_sigmas'],
+                                                    kalman_config['max_bridge_seconds'],
+                                                    kalman_config[probe]['restart_trend_std'])
+            if len(kalman_filters) > MAX_KALMAN_FILTERS:
+                kalman_filters.popitem(last=False)
+        kalman_filters.move_to_end(key)
+        return kalman_filters[key]
+
+def kalman_nbytes():
+    with kalman_lock:
+        return sum(f.nbytes for f in kalman_filters.values())
+
+def release_kalman_filter():
+    # The least recently used filter goes; it is rebuilt from the history on its next refresh
+    with kalman_lock:
+        if not kalman_filters:
+            return False
+        kalman_filters.popitem(last=False)
+        return True
+
+# The filters hold a smoothed copy of the history, so they count in its budget
+history.track('kalman_filters', kalman_nbytes, release_kalman_filter)
+
 app.layout = html.Div([
     # Main container with sidebar layout
     html.Div([
@@ -29,7 +101,7 @@ app.layout = html.Div([
             # Header with logo and title
             html.Div([
                 html.Img(
-                    src='/assets/logo.png',
+                    src=asset_url(app, 'logo.png'),
                     className='logo'
                 ),
                 html.H1(
@@ -60,10 +132,22 @@ app.layout = html.Div([
                         html.Span('🥩', className='temp-icon'),
                         html.Span('Meat:', className='temp-label'),
                         html.Div(id='current-meat-temp', children='--°C', className='temp-value meat-temp')
+                    ], className='temp-display'),
+                    html.Div([
+                        html.Span('⏱', className='temp-icon'),
+                        html.Span('Phase:', className='temp-label'),
+                        html.Div(id='cook-phase', children='--', className='temp-value phase-value'),
+                        html.Div(id='cook-eta', children='', className='temp-label')
                     ], className='temp-display')
                 ])
             ], className='card'),
 
+            # Recorder health, from the status file the recorder keeps up to date
+            html.Div([
+                html.H3('Recorder', className='section-header section-header-small'),
+                html.Div(id='recorder-health', children='--', className='health-text')
+            ], className='card'),
+
             # Temperature Settings
             html.Div([
                 html.H3('Target Temps', className='section-header section-header-small'),
@@ -115,6 +199,7 @@ app.layout = html.Div([
                              min=config['forecast']['constraints']['rolling_avg_window']['min'], 
                              max=config['forecast']['constraints']['rolling_avg_window']['max'], 
                              step=1, value=config['forecast']['rolling_avg_window'], 
+                             disabled=config['forecast']['method'] == 'kalman',  # The filter sets its own smoothing
                              className='input-field')
                 ], className='input-group')
             ], className='card'),
@@ -147,6 +232,10 @@ app.layout = html.Div([
                                  title="+3 for EEST\n+2 for EET",
                                  style={'marginLeft': '5px', 'cursor': 'help', 'color': '#666'})
                     ], style={'display': 'flex', 'alignItems': 'center'})
+                ], className='input-group'),
+                html.Div([
+                    html.Label('Units', className='input-label'),
+                    dcc.Dropdown(id='devices', multi=True, placeholder='All units', className='input-field')
                 ], className='input-group')
             ], className='card')
 
@@ -159,6 +248,12 @@ app.layout = html.Div([
 
     ], className='main-container'),
 
+    # Version of the data this browser is showing, lets interval ticks skip unchanged refreshes
+    dcc.Store(id='data-version'),
+
+    # Figure from the server without the target lines, those are added in the browser
+    dcc.Store(id='base-figure'),
+
     # Hidden timer for auto-refresh
     dcc.Interval(
         id='interval-component',
@@ -186,187 +281,236 @@ def create_empty_figure(message="No data available"):
     )
     return fig
 
+def data_version(folders, *params):
+    """
+    Identify what a refresh would render: the newest sample epoch plus a hash of the inputs and of
+    each device's newest sample. The date is included because 'previous_days' selects files relative to today.
+    """
+    latest = [latest_sample_epoch(path) for path in folders.values()]
+    param_hash = hashlib.sha1(repr((datetime.now().strftime('%Y%m%d'), tuple(folders), tuple(latest)) + params).encode()).hexdigest()[:16]
+    return f"{max((e for e in latest if e is not None), default=None)}:{param_hash}"
+
+# BBQ-themed color palettes with high contrast, one per unit: (full history, analysis window, forecast)
+DEVICE_PALETTES = [
+    {'smoker': ('#228B22', '#32CD32', '#90EE90'), 'meat': ('#8B0000', '#DC143C', '#FF6347')},  # Greens / reds
+    {'smoker': ('#B8860B', '#DAA520', '#F0D58C'), 'meat': ('#4B0082', '#8A2BE2', '#C9A0F0')},  # Golds / purples
+    {'smoker': ('#00688B', '#1E90FF', '#87CEFA'), 'meat': ('#8B4513', '#D2691E', '#F4A460')},  # Blues / browns
+]
+PROBE_TITLES = {'smoker': "🔥 Smoker", 'meat': "🥩 Meat"}
+
+def load_device_data(folder_path, previous_days, utc_offset, rolling_avg_window):
+    """
+    Cleaned and smoothed samples of one unit. Returns (df, filters, None) or (None, None, message);
+    filters maps each probe to its Kalman filter, or is None with the simple method.
+    """
+    # Parse temperature data
+    df = parse_temperature_data(previous_days=previous_days, history=history, folder_path=folder_path)
+    if df is None or df.empty:
+        return None, None, "No temperature data available"
+    
+    # Data cleaning and validation
+    df = df.dropna(subset=['datetime', 'smoker_temp', 'meat_temp'])  # Remove any NaN values
+    if df.empty:
+        return None, None, "No valid temperature data"
+    
+    # Convert timestamps and handle timezone; the Kalman filters get the raw epochs, which don't
+    # depend on the viewer's UTC offset
+    epochs = df['datetime']
+    df['datetime'] = pd.to_datetime(df['datetime'], unit='s', utc=True) + pd.Timedelta(hours=utc_offset)
+    df = df.drop_duplicates(subset=['datetime'], keep='first')
+    df = df.sort_values('datetime')
+    
+    # Validate temperature ranges (reasonable BBQ temperatures). Sessions recorded with the
+    # outlier filter are already clean, only older unfiltered rows need the range check.
+    unfiltered = df['smoker_flag'].isna() if 'smoker_flag' in df else pd.Series(True, index=df.index)
+    if unfiltered.any():
+        in_range = ((df['smoker_temp'] >= -10) & (df['smoker_temp'] <= 500) &
+                    (df['meat_temp'] >= -10) & (df['meat_temp'] <= 200))
+        df = df[~unfiltered | in_range]
+    
+    if df.empty:
+        return None, None, "No valid temperature readings in range"
+    
+    if config['forecast']['method'] == 'kalman':
+        # The filters smooth the history and keep their state for the forecast and the next refresh
+        epochs = epochs.loc[df.index].values
+        filters = {}
+        for probe in ('smoker', 'meat'):
+            filters[probe] = kalman_filter(folder_path, probe, previous_days)
+            df[f'{probe}_temp'] = filters[probe].update(epochs, df[f'{probe}_temp'].values)
+        return df, filters, None
+
+    # Apply smoothing with bounds checking
+    window_size = min(rolling_avg_window, len(df))
+    df['smoker_temp'] = df['smoker_temp'].rolling(window=window_size, min_periods=1).mean()
+    df['meat_temp'] = df['meat_temp'].rolling(window=window_size, min_periods=1).mean()
+    return df, None, None
+
+def forecast_device(df, past_minutes, forecast_minutes, filters=None):
+    """Analysis window and forecasts of one unit's data, from its Kalman filters when given."""
+    # Create a new dataframe containing only the last past_minutes
+    time_cutoff = df['datetime'].iloc[-1] - pd.Timedelta(minutes=past_minutes)
+    df_window = df[df['datetime'] >= time_cutoff]
+    
+    # Ensure we have enough data for forecasting
+    if len(df_window) < 3:
+        # Use more data if window is too small
+        df_window = df.tail(max(3, min(len(df), 50)))
+    
+    # Reshape the data to fit the model
+    full_time_min = df_window['datetime'].min()
+    X = (df_window['datetime'] - full_time_min).dt.total_seconds().values.reshape(-1, 1)
+    
+    # Predict for Future Times
+    last_value = X[-1] if np.isscalar(X[-1]) else X[-1][0]
+    future_times = np.arange(int(last_value) + 1, int(last_value) + forecast_minutes * 60 + 1).reshape(-1, 1)
+
+    forecasts = {'window': df_window, 'times': convert_to_time(future_times, full_time_min)}
+    for probe in ('smoker', 'meat'):
+        if filters:
+            # Extrapolate the filtered trend; the noise for the bands is estimated over the analysis window
+            forecasts[probe] = filters[probe].forecast(future_times.ravel() - last_value, recent=len(df_window))
+            continue
+        # Use enhanced forecasting with simple trend analysis
+        try:
+            forecasts[probe] = enhanced_forecast_temperature(X, df_window[f'{probe}_temp'].values, future_times, method='simple')
+        except Exception as e:
+            print(f"Enhanced forecasting failed, using basic polynomial: {e}")
+            forecasts[probe] = forecast_temperature(X, df_window[f'{probe}_temp'].values, future_times)
+    return forecasts
+
+def add_device_traces(fig, df, forecasts, palette, label=None):
+    """History, analysis window, forecast and confidence band traces of one unit."""
+    df_window = forecasts['window']
+    for probe in ('smoker', 'meat'):
+        full_color, window_color, pred_color = palette[probe]
+        group = f"{label}-{probe}" if label else probe
+        title = f"{PROBE_TITLES[probe]} ({label})" if label else PROBE_TITLES[probe]
+        forecast, upper_bound, lower_bound = forecasts[probe]
+
+        # Past temperature values
+        fig.add_scatter(x=df["datetime"], y=df[f"{probe}_temp"], mode='lines',
+                       line=dict(color=full_color, width=3),
+                       name='Full history', legendgroup=group, legendgrouptitle_text=title)
+        fig.add_scatter(x=df_window["datetime"], y=df_window[f"{probe}_temp"], mode='lines',
+                       line=dict(color=window_color, width=3), name='Analysis window', legendgroup=group)
+
+        # Predicted temperature values with confidence bands
+        fig.add_scatter(x=forecasts['times'], y=forecast, mode='lines',
+                       line=dict(color=pred_color, width=2, dash='dot'),
+                       name='Forecast', legendgroup=group)
+        if len(forecast) > 0 and len(upper_bound) > 0:
+            fig.add_scatter(x=forecasts['times'], y=upper_bound, mode='lines',
+                           line=dict(width=0), showlegend=False, hoverinfo='skip', legendgroup=group)
+            fig.add_scatter(x=forecasts['times'], y=lower_bound, mode='lines',
+                           line=dict(width=0), fillcolor=f'rgba({int(pred_color[1:3], 16)}, {int(pred_color[3:5], 16)}, {int(pred_color[5:7], 16)}, 0.2)',
+                           fill='tonexty', showlegend=False, hoverinfo='skip', legendgroup=group,
+                           name=f'{probe.capitalize()} Confidence')
+
+def chart_folders(selected_devices=None):
+    """All units with data, or only the ones picked in the sidebar."""
+    folders = device_folders()
+    if selected_devices:
+        folders = {name: path for name, path in folders.items() if name in selected_devices}
+    return folders
+
 @callback(
-    [Output('graph-content', 'figure'),
+    [Output('base-figure', 'data'),
      Output('current-smoker-temp', 'children'),
-     Output('current-meat-temp', 'children')],
+     Output('current-meat-temp', 'children'),
+     Output('data-version', 'data')],
     [Input('update-button', 'n_clicks'),
      Input('interval-component', 'n_intervals'),
-     Input("smoker_target_temp", "value"),
-     Input("meat_min_temp", "value"),
      Input("past_minutes", "value"),
      Input("forecast_minutes", "value"),
      Input("rolling_avg_window", "value"),
      Input("previous_days", "value"),
-     Input("utc_offset", "value")]
+     Input("utc_offset", "value"),
+     Input("devices", "value")],
+    [State('data-version', 'data')]
 )
-def update_graph(n_clicks, n_intervals, smoker_target_temp, meat_min_temp, past_minutes, forecast_minutes, rolling_avg_window, previous_days, utc_offset):
-    
+def update_graph(n_clicks, n_intervals, past_minutes, forecast_minutes, rolling_avg_window, previous_days, utc_offset, selected_devices, shown_version):
+
+    folders = chart_folders(selected_devices)
+
+    # Nothing new since this client's last refresh (e.g. the cook is over): skip the rebuild and
+    # answer with an empty 204 instead of resending the whole figure
+    version = data_version(folders, past_minutes, forecast_minutes, rolling_avg_window, previous_days, utc_offset)
+    if version == shown_version and ctx.triggered_id == 'interval-component':
+        raise PreventUpdate
+
     try:
         # Input validation
         if not all(isinstance(x, (int, float)) and x >= 0 for x in [past_minutes, forecast_minutes, rolling_avg_window, previous_days] if x is not None):
             print("Invalid input parameters detected")
-            return create_empty_figure("Invalid input parameters"), "--°C", "--°C"
+            return create_empty_figure("Invalid input parameters"), "--°C", "--°C", version
         
         # Ensure minimum values
         rolling_avg_window = max(config['forecast']['constraints']['rolling_avg_window']['min'], rolling_avg_window or config['forecast']['rolling_avg_window'])
         past_minutes = max(config['forecast']['constraints']['past_minutes']['min'], past_minutes or config['forecast']['past_minutes'])
         forecast_minutes = max(config['forecast']['constraints']['forecast_minutes']['min'], forecast_minutes or config['forecast']['forecast_minutes'])
         
-        # Parse temperature data
-        df = parse_temperature_data(previous_days=previous_days)
-        if df is None or df.empty:
+        if not folders:
             print("No temperature data available")
-            return create_empty_figure("No temperature data available"), "--°C", "--°C"
-        
-        # Data cleaning and validation
-        df = df.dropna()  # Remove any NaN values
-        if df.empty:
-            return create_empty_figure("No valid temperature data"), "--°C", "--°C"
-        
-        # Convert timestamps and handle timezone
-        df['datetime'] = pd.to_datetime(df['datetime'], unit='s', utc=True) + pd.Timedelta(hours=utc_offset)
-        df = df.drop_duplicates(subset=['datetime'], keep='first')
-        df = df.sort_values('datetime')
-        
-        # Validate temperature ranges (reasonable BBQ temperatures)
-        df = df[(df['smoker_temp'] >= -10) & (df['smoker_temp'] <= 500) & 
-                (df['meat_temp'] >= -10) & (df['meat_temp'] <= 200)]
-        
-        if df.empty:
-            return create_empty_figure("No valid temperature readings in range"), "--°C", "--°C"
-        
-        # Apply smoothing with bounds checking
-        window_size = min(rolling_avg_window, len(df))
-        df['smoker_temp'] = df['smoker_temp'].rolling(window=window_size, min_periods=1).mean()
-        df['meat_temp'] = df['meat_temp'].rolling(window=window_size, min_periods=1).mean()
+            return create_empty_figure("No temperature data available"), "--°C", "--°C", version
+
+        # Data of each unit; one without usable data is left out unless none has any
+        device_data, device_filters, message = {}, {}, None
+        for name, path in folders.items():
+            df, filters, error = load_device_data(path, previous_days, utc_offset, rolling_avg_window)
+            if df is None:
+                message = message or error
+                continue
+            device_data[name], device_filters[name] = df, filters
+        if not device_data:
+            return create_empty_figure(message), "--°C", "--°C", version
         
     except Exception as e:
         print(f"Error in data processing: {e}")
-        return create_empty_figure(f"Data processing error: {str(e)}"), "Error", "Error"
+        return create_empty_figure(f"Data processing error: {str(e)}"), "Error", "Error", None
 
-    # Get current temperatures for display
-    current_smoker = f"{df['smoker_temp'].iloc[-1]:.1f}°C" if not df.empty else "--°C"
-    current_meat = f"{df['meat_temp'].iloc[-1]:.1f}°C" if not df.empty else "--°C"
-
-    # Create a new dataframe containing only the last past_minutes
-    if len(df) == 0:
-        return create_empty_figure("No data for analysis"), "--°C", "--°C"
-    
-    time_cutoff = df['datetime'].iloc[-1] - pd.Timedelta(minutes=past_minutes)
-    df_window = df[df['datetime'] >= time_cutoff].copy()
-    
-    # Ensure we have enough data for forecasting
-    if len(df_window) < 3:
-        # Use more data if window is too small
-        df_window = df.tail(max(3, min(len(df), 50))).copy()
-    
-    # Reshape the data to fit the model
-    full_time_min = df_window['datetime'].min()
-    X = (df_window['datetime'] - full_time_min).dt.total_seconds().values.reshape(-1, 1)
-    
-    # Predict for Future Times
-    last_value = X[-1] if np.isscalar(X[-1]) else X[-1][0]
-    future_times = np.arange(int(last_value) + 1, int(last_value) + forecast_minutes * 60 + 1).reshape(-1, 1)
-    future_time_strings = convert_to_time(future_times, full_time_min)
-
-    # Use enhanced forecasting with simple trend analysis
-    try:
-        smoker_forecast, smoker_upper_bound, smoker_lower_bound = enhanced_forecast_temperature(
-            X, df_window['smoker_temp'].values, future_times, method='simple'
-        )
-        meat_forecast, meat_upper_bound, meat_lower_bound = enhanced_forecast_temperature(
-            X, df_window['meat_temp'].values, future_times, method='simple'
-        )
-    except Exception as e:
-        print(f"Enhanced forecasting failed, using basic polynomial: {e}")
-        smoker_forecast, smoker_upper_bound, smoker_lower_bound = forecast_temperature(X, df_window['smoker_temp'].values, future_times)
-        meat_forecast, meat_upper_bound, meat_lower_bound = forecast_temperature(X, df_window['meat_temp'].values, future_times)
-
-    time_now = df_window['datetime'].iloc[-1]
-    time_start_window = df_window['datetime'].iloc[0] # time_now - pd.Timedelta(minutes=past_minutes)
-
-    # BBQ-themed color palette with high contrast
-    smoker_full_color = '#228B22'  # Forest Green for smoker full history
-    smoker_window_color = '#32CD32'  # Lime Green for smoker analysis window
-    smoker_pred_color = '#90EE90'  # Light Green for smoker forecast
-    meat_full_color = '#8B0000'  # Dark Red for meat full history
-    meat_window_color = '#DC143C'  # Crimson for meat analysis window
-    meat_pred_color = '#FF6347'  # Tomato for meat forecast
-    vline_color = '#4FB0D6'  # Light Blue for vertical lines
+    # Get current temperatures for display, per unit when showing several
+    current = {}
+    for probe in ('smoker', 'meat'):
+        readings = {name: f"{df[f'{probe}_temp'].iloc[-1]:.1f}°C" for name, df in device_data.items()}
+        current[probe] = (next(iter(readings.values())) if len(readings) == 1
+                          else [html.Div(f"{name}: {value}") for name, value in readings.items()])
 
     fig = go.Figure()
-
-    # Past temperature values with BBQ-themed colors
-    fig.add_scatter(x=df["datetime"], y=df["smoker_temp"], mode='lines', 
-                   line=dict(color=smoker_full_color, width=3), 
-                   name='Full history', legendgroup='smoker', legendgrouptitle_text="🔥 Smoker")
-    fig.add_scatter(x=df["datetime"], y=df["meat_temp"], mode='lines', 
-                   line=dict(color=meat_full_color, width=3), 
-                   name='Full history', legendgroup='meat', legendgrouptitle_text="🥩 Meat")
-
-    fig.add_scatter(x=df_window["datetime"], y=df_window["smoker_temp"], mode='lines', 
-                   line=dict(color=smoker_window_color, width=3), name='Analysis window', legendgroup='smoker')
-    fig.add_scatter(x=df_window["datetime"], y=df_window["meat_temp"], mode='lines', 
-                   line=dict(color=meat_window_color, width=3), name='Analysis window', legendgroup='meat')
-
-    # Target temperature values
-    fig.add_hline(y=smoker_target_temp, line_width=2, line_color=smoker_full_color, line_dash="dash",
-                 annotation_text=f"Target: {smoker_target_temp}°C")
-    fig.add_hline(y=meat_min_temp, line_width=2, line_color=meat_full_color, line_dash="dash",
-                 annotation_text=f"Min: {meat_min_temp}°C")
-
-    # Predicted temperature values with confidence bands
-    fig.add_scatter(x=future_time_strings, y=smoker_forecast, mode='lines', 
-                   line=dict(color=smoker_pred_color, width=2, dash='dot'), 
-                   name='Forecast', legendgroup='smoker')
-    fig.add_scatter(x=future_time_strings, y=meat_forecast, mode='lines', 
-                   line=dict(color=meat_pred_color, width=2, dash='dot'), 
-                   name='Forecast', legendgroup='meat')
-    
-    # Add confidence bands for forecasts (if data available)
-    if len(smoker_forecast) > 0 and len(smoker_upper_bound) > 0:
-        fig.add_scatter(x=future_time_strings, y=smoker_upper_bound, mode='lines',
-                       line=dict(width=0), showlegend=False, hoverinfo='skip')
-        fig.add_scatter(x=future_time_strings, y=smoker_lower_bound, mode='lines',
-                       line=dict(width=0), fillcolor=f'rgba({int(smoker_pred_color[1:3], 16)}, {int(smoker_pred_color[3:5], 16)}, {int(smoker_pred_color[5:7], 16)}, 0.2)',
-                       fill='tonexty', showlegend=False, hoverinfo='skip', name='Smoker Confidence')
-    
-    if len(meat_forecast) > 0 and len(meat_upper_bound) > 0:
-        fig.add_scatter(x=future_time_strings, y=meat_upper_bound, mode='lines',
-                       line=dict(width=0), showlegend=False, hoverinfo='skip')
-        fig.add_scatter(x=future_time_strings, y=meat_lower_bound, mode='lines',
-                       line=dict(width=0), fillcolor=f'rgba({int(meat_pred_color[1:3], 16)}, {int(meat_pred_color[3:5], 16)}, {int(meat_pred_color[5:7], 16)}, 0.2)',
-                       fill='tonexty', showlegend=False, hoverinfo='skip', name='Meat Confidence')
-    
-    # Calculate axis limits based on actual temperature data and forecasts (excluding confidence intervals)
-    y_min = min(df['smoker_temp'].min(), df['meat_temp'].min()) - 5  # Add 5°C padding
-    y_max = max(df['smoker_temp'].max(), df['meat_temp'].max()) + 5  # Add 5°C padding
-    
-    # Include forecast predictions in axis calculation, but not confidence bands
-    if len(smoker_forecast) > 0:
-        forecast_min = min(smoker_forecast.min(), meat_forecast.min())
-        forecast_max = max(smoker_forecast.max(), meat_forecast.max())
-        y_min = min(y_min, forecast_min - 2)  # Less padding for forecasts
-        y_max = max(y_max, forecast_max + 2)
-    
-    # Ensure target temperature lines are always visible
-    target_temps = [smoker_target_temp, meat_min_temp]
-    if any(target_temps):
-        valid_targets = [temp for temp in target_temps if temp is not None]
-        if valid_targets:
-            target_min = min(valid_targets)
-            target_max = max(valid_targets)
-            y_min = min(y_min, target_min - 10)  # Extra padding below targets
-            y_max = max(y_max, target_max + 10)  # Extra padding above targets
+    multiple = len(device_data) > 1
+    y_min, y_max = np.inf, -np.inf
+    time_start_window, time_now = None, None
+    for i, (name, df) in enumerate(device_data.items()):
+        forecasts = forecast_device(df, past_minutes, forecast_minutes, device_filters[name])
+        add_device_traces(fig, df, forecasts, DEVICE_PALETTES[i % len(DEVICE_PALETTES)], name if multiple else None)
+
+        # Calculate axis limits based on actual temperature data and forecasts (excluding confidence intervals)
+        y_min = min(y_min, df['smoker_temp'].min() - 5, df['meat_temp'].min() - 5)  # Add 5°C padding
+        y_max = max(y_max, df['smoker_temp'].max() + 5, df['meat_temp'].max() + 5)
+        
+        # Include forecast predictions in axis calculation, but not confidence bands
+        for probe in ('smoker', 'meat'):
+            forecast = forecasts[probe][0]
+            if len(forecast) > 0:
+                y_min = min(y_min, forecast.min() - 2)  # Less padding for forecasts
+                y_max = max(y_max, forecast.max() + 2)
+
+        # The analysis box spans the windows of all units
+        window_times = forecasts['window']['datetime']
+        time_start_window = min(time_start_window, window_times.iloc[0]) if time_start_window is not None else window_times.iloc[0]
+        time_now = max(time_now, window_times.iloc[-1]) if time_now is not None else window_times.iloc[-1]
+
+    # Target lines and their share of the y-range are added in the browser (assets/figure.js)
     
-    # Add a transparent rectangular box for the analysis window
+    # Add a transparent rectangular box for the analysis window, spanning the full plot height
+    # so it doesn't depend on the final y-range
     fig.add_shape(
         type="rect",
         x0=time_start_window,
-        y0=y_min,
+        y0=0,
         x1=time_now,
-        y1=y_max,
+        y1=1,
+        yref="paper",
         fillcolor="rgba(75, 176, 214, 0.1)",  # More transparent light blue
         line=dict(color="rgba(75, 176, 214, 0.3)", width=1),
         layer="below"
@@ -375,7 +519,9 @@ def update_graph(n_clicks, n_intervals, smoker_target_temp, meat_min_temp, past_
     # Add label for the prediction window
     fig.add_annotation(
         x=time_start_window + (time_now - time_start_window) / 2,  # Center of the box
-        y=y_max - 2,  # Near the top with small margin
+        y=0.99,  # Near the top with small margin
+        yref="paper",
+        yanchor="top",
         text="Prediction Window",
         showarrow=False,
         font=dict(size=10, color="rgba(75, 176, 214, 0.8)"),
@@ -421,11 +567,116 @@ def update_graph(n_clicks, n_intervals, smoker_target_temp, meat_min_temp, past_
             size=12,
             color='#4a4a4a'
         ),
-        margin=dict(l=60, r=40, t=40, b=60)
+        margin=dict(l=60, r=40, t=40, b=60),
+        # Read by assets/figure.js to draw the target lines
+        meta=dict(
+            data_range=[float(y_min), float(y_max)],
+            target_colors=dict(smoker=DEVICE_PALETTES[0]['smoker'][0], meat=DEVICE_PALETTES[0]['meat'][0])
+        )
     )
 
-    return fig, current_smoker, current_meat
+    return fig, current['smoker'], current['meat'], version
+
+
+# Target lines only move two shapes and the y-range, so they're drawn in the browser on the
+# figure it already has instead of rebuilding the whole figure on the server
+clientside_callback(
+    ClientsideFunction(namespace='pibq', function_name='addTargetLines'),
+    Output('graph-content', 'figure'),
+    [Input('base-figure', 'data'),
+     Input("smoker_target_temp", "value"),
+     Input("meat_min_temp", "value")]
+)
+
+
+@callback(
+    [Output('cook-phase', 'children'),
+     Output('cook-eta', 'children')],
+    [Input('interval-component', 'n_intervals'),
+     Input("utc_offset", "value")]
+)
+def update_cook_phase(n_intervals, utc_offset):
+    # Phase and ETA are maintained by the recorder, here we only read its latest state
+    state = read_state_file(config['cook_phase']['state_file'])
+    if not state or not state.get('phase'):
+        return "--", ""
+
+    phase = state['phase'].capitalize()
+    if state['phase'] in ('finish', 'rest'):
+        return phase, "Meat at target"
+    if state.get('eta_seconds') is None:
+        return phase, "ETA: --"
+
+    hours, minutes = divmod(int(state['eta_seconds'] // 60), 60)
+    eta_clock = pd.to_datetime(state['eta_time'], unit='s') + pd.Timedelta(hours=utc_offset or 0)
+    return phase, f"ETA: {hours}h {minutes:02d}m ({eta_clock:%H:%M})"
+
+
+@callback(
+    Output('recorder-health', 'children'),
+    Input('interval-component', 'n_intervals')
+)
+def update_recorder_health(n_intervals):
+    status = read_status_file(config['recorder']['status_file'])
+    if not status:
+        return "No recorder status"
+
+    stalled = time.time() - (status['last_sample'] or status['started'])
+    state = "OK" if stalled < 10 * status['period'] else f"No samples for {stalled:.0f} s"
+    counters = status['counters']
+    read_p95 = [h['p95'] for h in status['read_latency_ms'].values() if h['p95'] is not None]
+    interval = status['sample_interval_s']
+    return [
+        html.Div(f"Status: {state}"),
+        html.Div(f"Cadence: {interval['mean'] or '--'} s (target {status['period']} s)"),
+        html.Div(f"I2C read p95: {max(read_p95) if read_p95 else '--'} ms"),
+        html.Div(f"Gaps: {counters['gaps']} ({status['gap_seconds']:.0f} s) | Overruns: {counters['overruns']}"),
+        html.Div(f"Read errors: {counters['read_errors']} | Restarts: {status['restarts']}"),
+    ]
+
+
+@callback(
+    Output('devices', 'options'),
+    Input('interval-component', 'n_intervals')
+)
+def update_device_options(n_intervals):
+    # Units show up here once they have recorded (or pushed) a session
+    return [{'label': name, 'value': name} for name in device_folders()]
+
+
+def snapshot_version(devices, past_minutes, forecast_minutes, previous_days, utc_offset):
+    return data_version(chart_folders(devices), past_minutes, forecast_minutes,
+                        config['forecast']['rolling_avg_window'], previous_days, utc_offset)
+
+def snapshot_units(devices, past_minutes, forecast_minutes, previous_days, utc_offset):
+    """(label, df, forecasts, palette) of each unit with data, drawn by snapshot.render_chart()."""
+    units = []
+    for name, path in chart_folders(devices).items():
+        df, filters, _ = load_device_data(path, previous_days, utc_offset, config['forecast']['rolling_avg_window'])
+        if df is not None:
+            units.append((name, df, forecast_device(df, past_minutes, forecast_minutes, filters),
+                          DEVICE_PALETTES[len(units) % len(DEVICE_PALETTES)]))
+    if len(units) == 1:
+        units[0] = (None,) + units[0][1:]
+    return units
+
+# Static chart images for clients that can't run the Dash page: /snapshot.png, /snapshot.svg, /snapshot
+snapshot_config = config['snapshot']
+if snapshot_config['enabled']:
+    snapshots = SnapshotCache(snapshot_config['cache_dir'], snapshot_config['max_files'],
+                              snapshot_config['min_interval_seconds'])
+    snapshot_defaults = {**config['forecast'], **config['session'], **config['temperatures']}
+    snapshot_constraints = {name: (limits['min'], limits['max']) for section in ('forecast', 'session')
+                            for name, limits in config[section]['constraints'].items()}
+    snapshot_constraints.update({name: (config['temperatures']['constraints']['min'], config['temperatures']['constraints']['max'])
+                                 for name in ('smoker_target', 'meat_minimum')})
+    register_snapshot(server, snapshots, snapshot_version, snapshot_units, snapshot_defaults, snapshot_constraints,
+                      config['update']['interval_seconds'])
+    metrics_sources['snapshot'] = snapshots.stats
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=False, threaded=True)
+    # Exit cleanly on SIGTERM so buffered pushed samples are written (gunicorn workers do this already)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Development server; use gunicorn (see pibq-dashboard.service) in production
+    app.run(host=config['server']['host'], port=config['server']['port'], debug=False, threaded=True)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""
+Columnar archive of finished cooking sessions and cross-session queries.
+
+Finished session CSVs are exported to Parquet, partitioned by date and label:
+    archive/date=20250801/label=chicken/20250801_120000.parquet
+
+Queries only open the partitions they need, read only the columns they need, and
+aggregate each session in parallel, so they don't slow down as the history grows.
+
+Examples:
+    python archive.py export --label chicken            # all finished sessions not archived yet
+    python archive.py export --session 20250801_120000 --label ribs --force
+    python archive.py time-between 60 74 --label chicken
+    python archive.py stability --label chicken --target 120
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from config import load_config
+from helpers import session_csv_columns
+UNLABELED = 'unlabeled'
+SMOOTHING_SAMPLES = 9  # Same default as the dashboard's smoothing window
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('label', pa.string())]), flavor='hive')
+
+
+# --- Export ----------------------------------------------------------------
+
+def read_session_csv(csv_path):
+    # Filtered temperatures plus outlier flags when the session has them (older ones don't)
+    names = session_csv_columns(csv_path)
+    include = [c for c in ('datetime', 'smoker_temp', 'meat_temp', 'smoker_flag', 'meat_flag') if c in names]
+    table = pa_csv.read_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(column_names=names),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={'datetime': pa.float64(), 'smoker_temp': pa.float32(), 'meat_temp': pa.float32(),
+                          'smoker_flag': pa.int8(), 'meat_flag': pa.int8()},
+            include_columns=include),
+    )
+    return table.rename_columns(['epoch'] + include[1:])
+
+
+def session_path(archive_dir, session, label):
+    date = session.split('_')[0]
+    return os.path.join(archive_dir, f'date={date}', f'label={label or UNLABELED}', f'{session}.parquet')
+
+
+def find_archived(archive_dir, session):
+    # A session can only be archived under one label, look it up regardless of which
+    date = session.split('_')[0]
+    date_dir = os.path.join(archive_dir, f'date={date}')
+    if not os.path.isdir(date_dir):
+        return None
+    for label_dir in os.listdir(date_dir):
+        path = os.path.join(date_dir, label_dir, f'{session}.parquet')
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def export_session(csv_path, archive_dir, label=None, force=False):
+    """Write one session CSV to the archive. Returns the Parquet path, or None if already archived."""
+    session = os.path.splitext(os.path.basename(csv_path))[0]
+    existing = find_archived(archive_dir, session)
+    if existing and not force:
+        return None
+    if existing:
+        os.remove(existing)
+
+    table = read_session_csv(csv_path)
+    table = table.filter(pc.is_valid(table['epoch'])).sort_by('epoch')
+    path = session_path(archive_dir, session, label)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(table, path, compression='zstd', row_group_size=64 * 1024)
+    return path
+
+
+def finished_sessions(folder_path, idle_minutes):
+    """Session CSVs that are no longer being written to. Empty ones (a recorder that stopped before its first row) are left out."""
+    csv_files = sorted(f for f in os.listdir(folder_path) if f.endswith('.csv'))
+    cutoff = time.time() - idle_minutes * 60
+    paths = [os.path.join(folder_path, f) for f in csv_files]
+    return [path for path in paths if os.path.getmtime(path) < cutoff and os.path.getsize(path) > 0]
+
+
+# --- Queries ---------------------------------------------------------------
+
+def session_fragments(archive_dir, label=None, date_from=None, date_to=None):
+    """Parquet fragments (one per session) matching the filters, pruned by partition only."""
+    if not os.path.isdir(archive_dir):
+        return []
+    dataset = ds.dataset(archive_dir, format='parquet', partitioning=PARTITIONING)
+    expression = None
+    for condition in (
+        ds.field('label') == label if label else None,
+        ds.field('date') >= date_from if date_from else None,
+        ds.field('date') <= date_to if date_to else None,
+    ):
+        if condition is not None:
+            expression = condition if expression is None else expression & condition
+    return list(dataset.get_fragments(filter=expression))
+
+
+def map_sessions(func, fragments, columns, workers=None):
+    """
+    Apply func(arrays) to every session in parallel and collect one result row per session.
+    Each worker reads only the requested columns of its own file; Arrow releases the GIL while
+    decoding, so threads scale across the Pi's cores.
+    """
+    def run(fragment):
+        table = fragment.to_table(columns=columns)
+        if len(table) == 0:
+            return None
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        session = os.path.splitext(os.path.basename(fragment.path))[0]
+        arrays = {name: table[name].to_numpy() for name in columns}
+        row = func(arrays)
+        if row is None:
+            return None
+        return {'session': session, 'date': keys.get('date'), 'label': keys.get('label'), **row}
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        rows = [r for r in pool.map(run, fragments) if r is not None]
+    return pd.DataFrame(rows)
+
+
+def _smooth(values):
+    if len(values) < SMOOTHING_SAMPLES:
+        return values
+    kernel = np.ones(SMOOTHING_SAMPLES) / SMOOTHING_SAMPLES
+    return np.convolve(values, kernel, mode='same')
+
+
+def time_between(archive_dir, meat_from, meat_to, label=None, date_from=None, date_to=None, workers=None):
+    """
+    Minutes the meat took to climb from meat_from to meat_to, per session.
+    e.g. time_between('./archive/', 60, 74, label='chicken')['minutes'].mean()
+    """
+    def measure(arrays):
+        meat = _smooth(arrays['meat_temp'].astype(np.float64))
+        above_from = np.flatnonzero(meat >= meat_from)
+        if not len(above_from):
+            return None
+        above_to = np.flatnonzero(meat[above_from[0]:] >= meat_to)
+        if not len(above_to):
+            return None
+        epoch = arrays['epoch']
+        start, end = epoch[above_from[0]], epoch[above_from[0] + above_to[0]]
+        return {'minutes': (end - start) / 60.0}
+
+    fragments = session_fragments(archive_dir, label, date_from, date_to)
+    return map_sessions(measure, fragments, ['epoch', 'meat_temp'], workers)
+
+
+def smoker_stability(archive_dir, target, band=10, label=None, date_from=None, date_to=None, workers=None):
+    """
+    How well the smoker held its target, per session. Only samples after the smoker first came
+    within `band` °C of the target count, so the preheat doesn't drag the numbers down.
+    """
+    def measure(arrays):
+        smoker = arrays['smoker_temp'].astype(np.float64)
+        in_band = np.abs(smoker - target) <= band
+        reached = np.flatnonzero(in_band)
+        if not len(reached):
+            return None
+        steady = smoker[reached[0]:]
+        epoch = arrays['epoch'][reached[0]:]
+        return {
+            'steady_minutes': (epoch[-1] - epoch[0]) / 60.0,
+            'mean': steady.mean(),
+            'std': steady.std(),
+            'mean_abs_error': np.abs(steady - target).mean(),
+            'pct_in_band': 100.0 * in_band[reached[0]:].mean(),
+        }
+
+    fragments = session_fragments(archive_dir, label, date_from, date_to)
+    return map_sessions(measure, fragments, ['epoch', 'smoker_temp'], workers)
+
+
+# --- CLI -------------------------------------------------------------------
+
+def main():
+    config = load_config()
+
+    parser = argparse.ArgumentParser(description='PiBQ session archive')
+    parser.add_argument('--archive', default=config['archive']['path'], help='Archive directory')
+    parser.add_argument('--data', default='./temperature/', help='Folder with session CSVs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Archive finished sessions')
+    export_parser.add_argument('--session', help='Only this session (e.g. 20250801_120000)')
+    export_parser.add_argument('--label', help='Label for the cook, e.g. chicken or ribs')
+    export_parser.add_argument('--force', action='store_true', help='Re-export (e.g. to change the label)')
+
+    for name in ('time-between', 'stability'):
+        query_parser = subparsers.add_parser(name)
+        query_parser.add_argument('--label', help='Only sessions with this label')
+        query_parser.add_argument('--from', dest='date_from', help='First date, YYYYMMDD')
+        query_parser.add_argument('--to', dest='date_to', help='Last date, YYYYMMDD')
+        if name == 'time-between':
+            query_parser.add_argument('meat_from', type=float, help='Start meat temperature (°C)')
+            query_parser.add_argument('meat_to', type=float, help='End meat temperature (°C)')
+        else:
+            query_parser.add_argument('--target', type=float, default=config['temperatures']['smoker_target'],
+                                      help='Smoker target temperature (°C)')
+            query_parser.add_argument('--band', type=float, default=10, help='Allowed deviation (°C)')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if args.session:
+            csv_files = [os.path.join(args.data, args.session + '.csv')]
+        else:
+            csv_files = finished_sessions(args.data, config['archive']['idle_minutes'])
+        for csv_path in csv_files:
+            # One unreadable session mustn't stop the others from being archived
+            try:
+                path = export_session(csv_path, args.archive, args.label, args.force)
+            except (OSError, pa.ArrowInvalid) as e:
+                print(f"Failed to archive {csv_path}: {e}")
+                continue
+            print(f"Archived {csv_path} -> {path}" if path else f"Skipped {csv_path} (already archived)")
+        return
+
+    if args.command == 'time-between':
+        result = time_between(args.archive, args.meat_from, args.meat_to, args.label, args.date_from, args.date_to)
+        column = 'minutes'
+    else:
+        result = smoker_stability(args.archive, args.target, args.band, args.label, args.date_from, args.date_to)
+        column = 'mean_abs_error'
+
+    if result.empty:
+        print("No matching sessions")
+        return
+    print(result.sort_values('session').to_string(index=False, float_format='%.1f'))
+    print(f"\nAverage {column} over {len(result)} sessions: {result[column].mean():.1f}")
+
+
+if __name__ == '__main__':
+    main()
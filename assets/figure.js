@@ -0,0 +1,45 @@
+// Clientside callbacks, registered in app.py with ClientsideFunction(namespace='pibq', ...)
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    pibq: {
+        // Add the target lines to the figure from the server and widen the y-range to show them.
+        // Runs in the browser, so editing a target doesn't cost a round trip to the Pi.
+        addTargetLines: function(figure, smokerTarget, meatMin) {
+            if (!figure) {
+                return window.dash_clientside.no_update;
+            }
+            const meta = (figure.layout && figure.layout.meta) || {};
+            if (!meta.data_range) {
+                return figure;  // Empty/error figure, nothing to draw on
+            }
+
+            const shapes = (figure.layout.shapes || []).slice();
+            const annotations = (figure.layout.annotations || []).slice();
+            let [yMin, yMax] = meta.data_range;
+
+            const targets = [
+                [smokerTarget, meta.target_colors.smoker, 'Target'],
+                [meatMin, meta.target_colors.meat, 'Min'],
+            ];
+            targets.forEach(function([value, color, label]) {
+                if (value === null || value === undefined || value === '') {
+                    return;
+                }
+                shapes.push({
+                    type: 'line', xref: 'paper', x0: 0, x1: 1, yref: 'y', y0: value, y1: value,
+                    line: {color: color, width: 2, dash: 'dash'}
+                });
+                annotations.push({
+                    xref: 'paper', x: 1, xanchor: 'right', yref: 'y', y: value, yanchor: 'bottom',
+                    text: `${label}: ${value}°C`, showarrow: false
+                });
+                // Extra padding around targets so the line and its label stay visible
+                yMin = Math.min(yMin, value - 10);
+                yMax = Math.max(yMax, value + 10);
+            });
+
+            const yaxis = Object.assign({}, figure.layout.yaxis, {range: [yMin, yMax]});
+            const layout = Object.assign({}, figure.layout, {shapes: shapes, annotations: annotations, yaxis: yaxis});
+            return Object.assign({}, figure, {layout: layout});
+        }
+    }
+});
@@ -0,0 +1,9 @@
+import os
+import yaml
+
+
+# Load configuration defaults
+def load_config():
+    config_path = os.path.join(os.path.dirname(__file__), 'defaults.yaml')
+    with open(config_path, 'r') as file:
+        return yaml.safe_load(file)
@@ -0,0 +1,158 @@
+import json
+import math
+import os
+import time
+
+from rolling_stats import RollingWindow
+
+PHASES = ('preheat', 'ramp', 'stall', 'finish', 'rest')
+
+
+class CookPhaseDetector:
+    """
+    Labels the cook phase and estimates the time until the meat reaches its minimum temperature.
+    Works on the live sample stream: every update is O(1) and memory is bounded by the slope window.
+
+    Phases:
+        preheat - smoker still coming up to temperature
+        ramp    - meat temperature climbing
+        stall   - meat temperature flat somewhere below the target (evaporative stall)
+        finish  - meat at or above its minimum temperature
+        rest    - meat cooling down after having finished
+    """
+
+    def __init__(self, smoker_target, meat_target, slope_window_seconds=600, preheat_margin=15,
+                 stall_slope=0.05, stall_min_temp=55, rest_slope=-0.2, min_phase_seconds=120):
+        self.smoker_target = smoker_target
+        self.meat_target = meat_target
+        self.preheat_margin = preheat_margin
+        self.stall_slope = stall_slope / 60.0  # Config is °C/min, windows work in °C/s
+        self.stall_min_temp = stall_min_temp
+        self.rest_slope = rest_slope / 60.0
+        self.min_phase_seconds = min_phase_seconds
+
+        self.windows = {'smoker': RollingWindow(slope_window_seconds), 'meat': RollingWindow(slope_window_seconds)}
+        self.phase = None
+        self.phase_since = None
+        self.candidate = None
+        self.candidate_since = None
+        self.finished = False
+        self.last_epoch = None
+
+    def _classify(self):
+        smoker, meat = self.windows['smoker'], self.windows['meat']
+        smoker_level, meat_level = smoker.level(), meat.level()
+        meat_slope = meat.slope() or 0.0
+
+        if self.finished:
+            return 'rest' if meat_slope < self.rest_slope else 'finish'
+        if meat_level >= self.meat_target:
+            return 'finish'
+        if smoker_level < self.smoker_target - self.preheat_margin and meat_slope <= self.stall_slope:
+            return 'preheat'
+        if meat_level >= self.stall_min_temp and meat_slope <= self.stall_slope:
+            return 'stall'
+        return 'ramp'
+
+    def update(self, epoch, smoker_temp, meat_temp):
+        """
+        Feed one sample. Returns an event dict when the reported phase changes, otherwise None.
+        """
+        if smoker_temp is None or meat_temp is None or math.isnan(smoker_temp) or math.isnan(meat_temp):
+            return None
+        self.windows['smoker'].add(epoch, smoker_temp)
+        self.windows['meat'].add(epoch, meat_temp)
+        self.last_epoch = epoch
+
+        candidate = self._classify()
+        if candidate != self.candidate:
+            self.candidate, self.candidate_since = candidate, epoch
+
+        # Debounce: a new phase has to hold for a while before it is reported
+        if candidate == self.phase:
+            return None
+        if self.phase is not None and epoch - self.candidate_since < self.min_phase_seconds:
+            return None
+
+        previous = self.phase
+        self.phase, self.phase_since = candidate, self.candidate_since
+        if candidate == 'finish':
+            self.finished = True
+        return {
+            'time': epoch,
+            'rule': 'cook_phase',
+            'kind': 'phase',
+            'probe': 'meat',
+            'state': candidate,
+            'value': round(self.windows['meat'].level(), 2),
+            'message': f"cook_phase: {previous or 'start'} -> {candidate}",
+        }
+
+    def eta_seconds(self):
+        """
+        Seconds until the meat reaches its minimum temperature, None if it isn't climbing or the
+        slope window isn't mostly filled yet.
+        """
+        meat = self.windows['meat']
+        slope, level = meat.slope(), meat.level()
+        if slope is None or level is None:
+            return None
+        if level >= self.meat_target:
+            return 0.0
+        # Like RateRule: a slope over the first few samples is just noise
+        if meat.span() < 0.8 * meat.window_seconds or slope <= self.stall_slope:
+            return None
+        return (self.meat_target - level) / slope
+
+    def state(self):
+        """Snapshot of the detector for the dashboard and other readers."""
+        eta = self.eta_seconds()
+        probes = {}
+        for probe, window in self.windows.items():
+            slope, variance = window.slope(), window.variance()
+            probes[probe] = {
+                'temp': round(window.level(), 2) if window.n else None,
+                'slope_per_min': round(slope * 60, 3) if slope is not None else None,
+                'std': round(math.sqrt(variance), 3) if variance is not None else None,
+            }
+        return {
+            'time': self.last_epoch,
+            'phase': self.phase,
+            'phase_since': self.phase_since,
+            'eta_seconds': round(eta) if eta is not None else None,
+            'eta_time': self.last_epoch + eta if eta is not None else None,
+            'smoker_target': self.smoker_target,
+            'meat_target': self.meat_target,
+            'probes': probes,
+        }
+
+
+def build_phase_detector(config):
+    """Create a CookPhaseDetector from the 'cook_phase' section of defaults.yaml (None if disabled)."""
+    phase_config = dict(config.get('cook_phase') or {})
+    if not phase_config.pop('enabled', False):
+        return None
+    for key in ('state_file', 'write_interval_seconds'):
+        phase_config.pop(key, None)
+    return CookPhaseDetector(config['temperatures']['smoker_target'], config['temperatures']['meat_minimum'],
+                             **phase_config)
+
+
+def write_state_file(path, state):
+    # Write to a temp file and rename so readers never see a half-written file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def read_state_file(path, max_age_seconds=300):
+    """Latest detector state written by the recorder, None if missing or stale."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not state.get('time') or time.time() - state['time'] > max_age_seconds:
+        return None
+    return state
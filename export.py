@@ -0,0 +1,220 @@
+"""
+Streaming data export from the dashboard server, so sessions can be pulled off the Pi over HTTP.
+
+    GET /export?start=2025-08-01T12:00&end=2025-08-01T20:00&probes=meat&format=csv&every=60
+
+Parameters (all optional):
+    start, end  epoch seconds or ISO 8601 time (without a UTC offset: dashboard local time).
+                Default: the latest session up to now
+    probes      comma separated, smoker and/or meat (default both)
+    fields      comma separated, temp, raw, flag, min and/or max (default temp)
+    format      csv, ndjson or arrow (Arrow IPC stream)
+    device      unit to export, 'local' (default) or the name a pushing recorder uses
+    every       downsample to one row per this many seconds (means, flag sums, min of mins, max of maxes)
+
+Rows are read in chunks and streamed as they are produced, so memory use is constant however
+long the requested range is.
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from flask import Response, request, abort
+
+from helpers import session_csv_columns, first_sample_epoch, last_sample_epoch, LOCAL_DEVICE
+from ingest import DEVICE_PATTERN
+
+PROBES = ('smoker', 'meat')
+FIELDS = ('temp', 'raw', 'flag', 'min', 'max')
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+CHUNK_ROWS = 20000
+
+
+def parse_time(value, utc_offset):
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp - pd.Timedelta(hours=utc_offset)
+    else:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return (timestamp - pd.Timestamp(0)).total_seconds()
+
+
+def session_files(folder_path, start, end):
+    """Session CSVs with samples between start and end, oldest first."""
+    csv_files = sorted(f for f in os.listdir(folder_path) if f.endswith('.csv')) if os.path.isdir(folder_path) else []
+    paths = []
+    for f in csv_files:
+        path = os.path.join(folder_path, f)
+        first, last = first_sample_epoch(path), last_sample_epoch(path)
+        if first is not None and last is not None and first < end and last >= start:
+            paths.append(path)
+    return paths
+
+
+def read_range(paths, start, end, columns):
+    """DataFrame chunks of the requested columns between start and end (columns a session lacks are NaN)."""
+    for path in paths:
+        names = session_csv_columns(path)
+        usecols = ['datetime'] + [c for c in columns if c in names]
+        for chunk in pd.read_csv(path, header=None, names=names, usecols=usecols, chunksize=CHUNK_ROWS):
+            chunk = chunk.dropna(subset=['datetime'])  # e.g. a row the recorder is still writing
+            if chunk.empty:
+                continue
+            if chunk['datetime'].iloc[0] >= end:
+                break
+            chunk = chunk[(chunk['datetime'] >= start) & (chunk['datetime'] < end)]
+            if not chunk.empty:
+                yield chunk.reindex(columns=['datetime'] + columns).astype(np.float64)
+
+
+def _partials(df, every):
+    # Per-bucket sums, counts, mins and maxes; two partials of the same bucket combine exactly
+    grouped = df.drop(columns='datetime').groupby(df['datetime'] // every, sort=True)
+    return {'sum': grouped.sum(), 'count': grouped.count(), 'min': grouped.min(), 'max': grouped.max()}
+
+
+def _merge(pending, partials):
+    return {stat: pd.concat([pending[stat], frame]).groupby(level=0).agg('sum' if stat in ('sum', 'count') else stat)
+            for stat, frame in partials.items()}
+
+
+def _finish(partials, every):
+    count = partials['count']
+    result = partials['sum'] / count.where(count > 0)
+    for column in result.columns:
+        if column.endswith('_flag'):
+            result[column] = partials['sum'][column].where(count[column] > 0)  # NaN for sessions without flags
+        elif column.endswith(('_min', '_max')):
+            result[column] = partials[column[-3:]][column]
+    result.insert(0, 'datetime', result.index * every)
+    return result.reset_index(drop=True)
+
+
+def downsample(chunks, every):
+    """
+    One row per `every` seconds (means, flag sums, min of mins, max of maxes). Only the partial
+    aggregates of the last bucket of a chunk are carried to the next one, so memory use doesn't
+    depend on how many rows a bucket has.
+    """
+    pending = None
+    for chunk in chunks:
+        partials = _partials(chunk, every)
+        if pending is not None:
+            partials = _merge(pending, partials)
+        complete = {stat: frame.iloc[:-1] for stat, frame in partials.items()}
+        pending = {stat: frame.iloc[-1:] for stat, frame in partials.items()}
+        if len(complete['sum']):
+            yield _finish(complete, every)
+    if pending is not None:
+        yield _finish(pending, every)
+
+
+class _ChunkSink:
+    # File-like object for the Arrow IPC writer; the bytes are collected and handed to the response
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def encode_csv(chunks, columns):
+    yield ','.join(['epoch'] + columns) + '\n'
+    for chunk in chunks:
+        yield chunk.to_csv(header=False, index=False, float_format='%.4f', lineterminator='\n')
+
+
+def encode_ndjson(chunks, columns):
+    for chunk in chunks:
+        text = chunk.rename(columns={'datetime': 'epoch'}).to_json(orient='records', lines=True, double_precision=4)
+        yield text if text.endswith('\n') else text + '\n'
+
+
+def encode_arrow(chunks, columns):
+    import pyarrow as pa
+    schema = pa.schema([('epoch', pa.float64())] + [(c, pa.float32()) for c in columns])
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in chunks:
+        chunk = chunk.rename(columns={'datetime': 'epoch'})
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson, 'arrow': encode_arrow}
+
+
+def _list_arg(name, allowed, default):
+    values = [v.strip() for v in request.args.get(name, default).split(',') if v.strip()]
+    unknown = [v for v in values if v not in allowed]
+    if unknown or not values:
+        abort(400, f"Unknown {name}: {', '.join(unknown) or '(none)'}; use {', '.join(allowed)}")
+    return values
+
+
+def register_export(server, folder_path='./temperature/', utc_offset=0):
+    """Add the /export endpoint to the dashboard's Flask server."""
+
+    @server.route('/export')
+    def export():
+        fmt = request.args.get('format', 'csv')
+        if fmt not in FORMATS:
+            abort(400, f"Unknown format: {fmt}; use {', '.join(FORMATS)}")
+        if fmt == 'arrow':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                abort(501, "Arrow export needs pyarrow installed")
+        probes = _list_arg('probes', PROBES, ','.join(PROBES))
+        fields = _list_arg('fields', FIELDS, 'temp')
+        columns = [f"{probe}_{field}" for probe in probes for field in fields]
+
+        device = request.args.get('device', LOCAL_DEVICE)
+        if device != LOCAL_DEVICE and not DEVICE_PATTERN.match(device):
+            abort(400, f"Invalid device name '{device}'")
+        data_path = folder_path if device == LOCAL_DEVICE else os.path.join(folder_path, device)
+
+        try:
+            end = parse_time(request.args['end'], utc_offset) if 'end' in request.args else float('inf')
+            if 'start' in request.args:
+                start = parse_time(request.args['start'], utc_offset)
+            else:
+                latest = session_files(data_path, float('-inf'), end)[-1:]
+                start = first_sample_epoch(latest[0]) if latest else 0.0
+            every = float(request.args.get('every', 0))
+        except ValueError as e:
+            abort(400, f"Invalid parameter: {e}")
+        if not math.isfinite(every) or every < 0 or math.isnan(start) or math.isnan(end):
+            abort(400, "start and end must be times and every a positive number of seconds")
+
+        chunks = read_range(session_files(data_path, start, end), start, end, columns)
+        if every:
+            chunks = downsample(chunks, every)
+
+        filename = f"pibq_{device}_{'_'.join(probes)}.{'arrows' if fmt == 'arrow' else fmt}"
+        return Response(ENCODERS[fmt](chunks, columns), mimetype=FORMATS[fmt],
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
@@ -0,0 +1,144 @@
+import math
+from collections import deque
+
+# Scale factor that makes the MAD an estimate of the standard deviation for Gaussian noise
+MAD_SCALE = 1.4826
+
+FLAG_OK = 0
+FLAG_OUTLIER = 1
+
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else 0.5 * (ordered[middle - 1] + ordered[middle])
+
+
+class HampelFilter:
+    """
+    Streaming Hampel filter for one probe: a reading further than n_sigmas robust standard
+    deviations (MAD) from the rolling median of recent readings is flagged as an outlier and
+    substituted. Readings outside the physically valid range are always outliers.
+
+    Each update sorts a small fixed window, so the cost per sample is constant.
+    """
+
+    def __init__(self, window=9, n_sigmas=3.5, min_mad=0.25, substitution='median', valid_range=None):
+        if substitution not in ('median', 'last', 'nan'):
+            raise ValueError(f"Unknown substitution '{substitution}', use median, last or nan")
+        self.values = deque(maxlen=window)
+        self.n_sigmas = n_sigmas
+        self.min_mad = min_mad
+        self.substitution = substitution
+        self.valid_range = valid_range
+        self.last_clean = None
+
+    def update(self, value):
+        """Returns (cleaned value, flag) for one raw reading."""
+        in_range = value is not None and not math.isnan(value) and (
+            self.valid_range is None or self.valid_range[0] <= value <= self.valid_range[1])
+
+        # Garbage readings never enter the window, so they can't drag the median along
+        if in_range:
+            self.values.append(value)
+        if not self.values:
+            return (value if in_range else math.nan), (FLAG_OK if in_range else FLAG_OUTLIER)
+
+        median = _median(self.values)
+        sigma = max(MAD_SCALE * _median([abs(v - median) for v in self.values]), self.min_mad)
+
+        if in_range and (len(self.values) < 3 or abs(value - median) <= self.n_sigmas * sigma):
+            self.last_clean = value
+            return value, FLAG_OK
+
+        if self.substitution == 'median':
+            clean = median
+        elif self.substitution == 'last' and self.last_clean is not None:
+            clean = self.last_clean
+        else:
+            clean = math.nan
+        return clean, FLAG_OUTLIER
+
+
+def build_filters(config, probes=('smoker', 'meat')):
+    """One HampelFilter per probe from the 'filter' section of defaults.yaml (None if disabled)."""
+    filter_config = config.get('filter') or {}
+    if not filter_config.get('enabled'):
+        return None
+    ranges = filter_config.get('valid_range') or {}
+    return {
+        probe: HampelFilter(window=filter_config['window'], n_sigmas=filter_config['n_sigmas'],
+                            min_mad=filter_config['min_mad'], substitution=filter_config['substitution'],
+                            valid_range=ranges.get(probe))
+        for probe in probes
+    }
+
+
+class CICDecimator:
+    """
+    Cascaded integrator-comb decimator: averages `factor` oversampled readings into one output.
+    order=1 is a plain block average, higher orders have better alias rejection at the cost of
+    a longer impulse response. Runs in fixed point on Python ints, so the integrators never lose
+    precision however long the recorder runs.
+
+    Each output is time-stamped at the centre of the readings it weights (its group delay) and
+    its min/max cover those same readings. A failed read (None) is filled in with the mean of the
+    other reads of its interval and counted in the output's flags; when none of an interval's
+    reads succeeded there's no output, so nothing is made up.
+    """
+
+    def __init__(self, factor, order=1, resolution=0.001):
+        self.factor = factor
+        self.order = order
+        self.resolution = resolution
+        self.integrators = [0] * order
+        self.delays = [0] * order
+        self.warmup = order - 1  # The first outputs are incomplete until every stage has filled
+        self.block = []
+        # (epoch, value or None if filled in, flags) of the order * (factor - 1) + 1 reads behind an output
+        self.recent = deque(maxlen=order * (factor - 1) + 1)
+
+    def add(self, value, epoch, flag=0):
+        """
+        Feed one reading taken at epoch, with its outlier flag. Every `factor` readings returns
+        (epoch, mean, min, max, flags), or None while warming up or when the interval had no valid
+        read. flags counts outliers and filled-in failed reads.
+        """
+        self.block.append((value, epoch, flag))
+        if len(self.block) < self.factor:
+            return None
+        block, self.block = self.block, []
+
+        # NaN is a substituted outlier; like a failed read it can't go into the integrators
+        valid = [v for v, _, _ in block if v is not None and not math.isnan(v)]
+        fill = sum(valid) / len(valid) if valid else 0.0
+        for v, e, f in block:
+            ok = v is not None and not math.isnan(v)
+            self.recent.append((e, v if ok else None, f + (v is None)))
+            x = round((v if ok else fill) / self.resolution)
+            for i in range(self.order):
+                self.integrators[i] += x
+                x = self.integrators[i]
+
+        y = self.integrators[-1]
+        for i in range(self.order):
+            y, self.delays[i] = y - self.delays[i], y
+
+        if not valid:
+            # The next outputs of a higher order filter still include this interval: skip them too
+            self.warmup = self.order - 1
+            if all(v is None for v, _, _ in block):
+                return None
+            return self._stamp(), math.nan, math.nan, math.nan, sum(f for _, _, f in self.recent)
+        if self.warmup > 0:
+            self.warmup -= 1
+            return None
+
+        values = [v for _, v, _ in self.recent if v is not None]
+        return self._stamp(), y / self.factor ** self.order * self.resolution, min(values), max(values), \
+            sum(f for _, _, f in self.recent)
+
+    def _stamp(self):
+        # Centre of the impulse response, between two reads when its length is even
+        n = len(self.recent)
+        return (self.recent[(n - 1) // 2][0] + self.recent[n // 2][0]) / 2
@@ -0,0 +1,28 @@
+# Gunicorn configuration for serving the PiBQ dashboard in production.
+# Usage: gunicorn -c gunicorn.conf.py app:server
+import os
+from config import load_config
+
+server_config = load_config()['server']
+
+bind = f"{server_config['host']}:{server_config['port']}"
+
+# A few preloaded worker processes, each with a small thread pool. The app is imported once in
+# the master before forking, so workers share its memory pages copy-on-write and start instantly.
+workers = int(os.environ.get('PIBQ_WORKERS', server_config['workers']))
+threads = int(os.environ.get('PIBQ_THREADS', server_config['threads']))
+worker_class = 'gthread'
+preload_app = True
+
+# Figure building can take a few seconds on a Pi with long sessions
+timeout = 60
+graceful_timeout = 10
+keepalive = 5
+
+# Recycle workers now and then to keep memory in check on a long-running Pi
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = None
+errorlog = '-'
+loglevel = 'info'
@@ -63,8 +63,74 @@ def forecast_temperature(X, y, future_times):
 
     return future_predictions, upper_bound, lower_bound
 
-def parse_temperature_data(previous_days):
-    # Parse all temperature data from today's sessions
+def latest_sample_epoch(folder_path='./temperature/'):
+    # Epoch of the last complete sample in the newest session file.
+    # Only the tail of the file is read, so this is cheap enough to call on every refresh.
+    if not os.path.isdir(folder_path):
+        return None
+    csv_files = sorted(f for f in os.listdir(folder_path) if f.endswith('.csv'))
+    if not csv_files:
+        return None
+    return last_sample_epoch(os.path.join(folder_path, csv_files[-1]))
+
+def first_sample_epoch(file_path):
+    with open(file_path, 'rb') as f:
+        try:
+            return float(f.readline().split(b',')[0])
+        except ValueError:
+            return None
+
+def last_sample_epoch(file_path):
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 512))
+        # Everything after the last newline may be a row the recorder is still writing
+        lines = f.read().split(b'\n')[:-1]
+
+    for line in reversed(lines):
+        try:
+            return float(line.split(b',')[0])
+        except ValueError:
+            continue
+    return None
+
+# Session CSV layout written by record_temp.py. Older sessions only have the first three (or seven)
+# columns. smoker_temp/meat_temp are already outlier-filtered, the flags count substituted readings
+# and min/max cover the readings averaged into each row when the recorder oversamples.
+CSV_COLUMNS = ['datetime', 'smoker_temp', 'meat_temp', 'smoker_raw', 'meat_raw', 'smoker_flag', 'meat_flag',
+               'smoker_min', 'smoker_max', 'meat_min', 'meat_max']
+DASHBOARD_COLUMNS = ['datetime', 'smoker_temp', 'meat_temp', 'smoker_flag']
+
+def session_csv_columns(file_path):
+    # Column names for a session file, based on the number of fields in its first row
+    with open(file_path, 'r', encoding='utf-8') as f:
+        first_line = f.readline()
+    return CSV_COLUMNS[:len(first_line.split(','))] if first_line.strip() else CSV_COLUMNS[:3]
+
+def read_session_csv(file_path, columns=DASHBOARD_COLUMNS):
+    names = session_csv_columns(file_path)
+    return pd.read_csv(file_path, header=None, names=names, usecols=[c for c in columns if c in names])
+
+# Name of the recorder on the dashboard's own Pi; units pushing over the network (ingest.py)
+# get a subfolder of the data folder each
+LOCAL_DEVICE = 'local'
+
+def device_folders(folder_path='./temperature/'):
+    # Data folder of every unit with recorded sessions, local unit first
+    if not os.path.isdir(folder_path):
+        return {}
+    folders = {}
+    if any(f.endswith('.csv') for f in os.listdir(folder_path)):
+        folders[LOCAL_DEVICE] = folder_path
+    for name in sorted(os.listdir(folder_path)):
+        path = os.path.join(folder_path, name)
+        if os.path.isdir(path) and any(f.endswith('.csv') for f in os.listdir(path)):
+            folders[name] = path
+    return folders
+
+def parse_temperature_data(previous_days, history=None, folder_path='./temperature/'):
+    # Parse all temperature data from today's sessions.
+    # With a history.HistoryCache, files are read through the cache instead of from scratch.
 
     # Get today's date in YYYYMMDD format
     today_date = datetime.now().strftime('%Y%m%d')
@@ -73,9 +139,6 @@ def parse_temperature_data(previous_days):
         date = (datetime.now() - pd.Timedelta(days=i)).strftime('%Y%m%d')
         date_range.append(date)
 
-    # Define the path to the folder
-    folder_path = './temperature/'
-
     # List all files in the directory
     all_files = os.listdir(folder_path)
     csv_files = [f for f in all_files if f.endswith('.csv')]
@@ -86,7 +149,9 @@ def parse_temperature_data(previous_days):
 
     if previous_days == 0: # Load most recent session
         file_path = os.path.join(folder_path, csv_files[-1])
-        df = pd.read_csv(file_path, header=None, names=['datetime', 'smoker_temp', 'meat_temp'])
+        if history is not None:
+            return history.load([file_path])
+        df = read_session_csv(file_path)
         return df
     else:
         # Filter files that start with today's date and end with .csv
@@ -101,13 +166,16 @@ def parse_temperature_data(previous_days):
             print("No temperature data files found for specified date range")
             return None
 
+        if history is not None:
+            return history.load([os.path.join(folder_path, f) for f in filtered_files])
+
         # List to hold dataframes
         df_list = []
 
         # Load each csv file into a dataframe and append to list
         for file in filtered_files:
             file_path = os.path.join(folder_path, file)
-            df = pd.read_csv(file_path, header=None, names=['datetime', 'smoker_temp', 'meat_temp'])
+            df = read_session_csv(file_path)
             df_list.append(df)
 
         # Concatenate all dataframes into a single dataframe
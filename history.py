@@ -0,0 +1,175 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from helpers import session_csv_columns, DASHBOARD_COLUMNS
+
+# Temperatures don't need more than float32; epochs do need float64
+DTYPES = {'datetime': np.float64, 'smoker_temp': np.float32, 'meat_temp': np.float32, 'smoker_flag': np.float32}
+
+
+class _Entry:
+    def __init__(self, frame, offset, mtime, rollup=0):
+        self.frame = frame
+        self.offset = offset  # Bytes of the file parsed so far (up to the last complete line)
+        self.mtime = mtime
+        self.rollup = rollup  # Seconds per row, 0 = full resolution
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(index=True).sum())
+
+
+def _parse(data, names):
+    columns = [c for c in DASHBOARD_COLUMNS if c in names]
+    if not data:
+        return pd.DataFrame({c: pd.Series(dtype=DTYPES[c]) for c in columns})
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=columns)
+    return df.astype({c: DTYPES[c] for c in columns})
+
+
+def rollup(df, seconds):
+    """
+    Downsample to one row per `seconds` bucket. Medians, so a stray spike in an old unfiltered
+    session doesn't leak into the rollup; flag columns keep NaN for unfiltered sessions.
+    """
+    if df.empty:
+        return df
+    buckets = (df['datetime'] // seconds).to_numpy()
+    return df.groupby(buckets, sort=True).median().reset_index(drop=True).astype(df.dtypes.to_dict())
+
+
+class HistoryCache:
+    """
+    Session data kept in memory between dashboard refreshes, within a fixed budget.
+
+    The newest (active) session stays at full resolution and only the lines appended since the
+    last refresh are parsed. Older sessions are kept as rollups. When the loaded history doesn't
+    fit the budget, entries not needed for the current request are evicted first, then memory
+    tracked for the history elsewhere is released, then the oldest requested sessions are coarsened
+    further and finally dropped.
+
+    The budget is per process; every gunicorn worker holds its own cache.
+    """
+
+    def __init__(self, budget_mb=32, rollup_seconds=60, max_rollup_seconds=3600):
+        self.budget = int(budget_mb * 2**20)
+        self.rollup_seconds = rollup_seconds
+        self.max_rollup_seconds = max_rollup_seconds
+        self.entries = OrderedDict()  # path -> _Entry, least recently used first
+        self.lock = threading.Lock()
+        self.tracked = {}  # name -> (nbytes, release)
+        self.counters = {'full_reads': 0, 'incremental_reads': 0, 'evictions': 0, 'released': 0, 'coarsened': 0,
+                         'dropped': 0}
+
+    def track(self, name, nbytes, release=None):
+        """
+        Count memory derived from the history and held elsewhere (e.g. filter state) in the budget
+        and stats. nbytes() returns its size; release() frees some of it, returning False when
+        there's nothing left to free. Both are called with the cache locked.
+        """
+        with self.lock:
+            self.tracked[name] = (nbytes, release)
+
+    def load(self, paths):
+        """Combined DataFrame for the given session files (sorted oldest first, last one active)."""
+        with self.lock:
+            for i, path in enumerate(paths):
+                self._refresh(path, active=(i == len(paths) - 1))
+                self.entries.move_to_end(path)
+            self._enforce_budget(paths)
+            frames = [self.entries[p].frame for p in paths if p in self.entries]
+        if not frames:
+            return None
+        # Cached frames are shared between requests and threads, so callers always get their own copy
+        # (pandas 2 doesn't copy on write by default); concat already builds a new frame
+        return frames[0].copy() if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    def _refresh(self, path, active):
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+
+        if entry is None or stat.st_size < entry.offset or (active and entry.rollup):
+            # New to the cache, the file was replaced, or a rolled-up session is being shown live again
+            with open(path, 'rb') as f:
+                data = f.read()
+            end = data.rfind(b'\n') + 1  # Skip a line the recorder may still be writing
+            entry = _Entry(_parse(data[:end], session_csv_columns(path)), end, stat.st_mtime)
+            self.entries[path] = entry
+            self.counters['full_reads'] += 1
+        elif stat.st_mtime != entry.mtime and stat.st_size > entry.offset and entry.rollup == 0:
+            # Only parse what the recorder appended since the last refresh
+            with open(path, 'rb') as f:
+                f.seek(entry.offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end:
+                new_rows = _parse(data[:end], session_csv_columns(path))
+                entry.frame = pd.concat([entry.frame, new_rows], ignore_index=True)
+                entry.offset += end
+            entry.mtime = stat.st_mtime
+            self.counters['incremental_reads'] += 1
+
+        if not active and entry.rollup < self.rollup_seconds:
+            entry.frame = rollup(entry.frame, self.rollup_seconds)
+            entry.rollup = self.rollup_seconds
+
+    def _enforce_budget(self, requested):
+        requested = set(requested)
+
+        # Sessions the current view doesn't need go first, least recently used first
+        for path in list(self.entries):
+            if self.nbytes() <= self.budget:
+                return
+            if path not in requested:
+                del self.entries[path]
+                self.counters['evictions'] += 1
+
+        # Then what's held elsewhere, it can be rebuilt from the history
+        for nbytes, release in self.tracked.values():
+            while release and self.nbytes() > self.budget and release():
+                self.counters['released'] += 1
+
+        # Then coarsen the oldest finished sessions, doubling their bucket size
+        finished = sorted(p for p in requested if p in self.entries)[:-1]
+        for path in finished:
+            entry = self.entries[path]
+            while self.nbytes() > self.budget and entry.rollup * 2 <= self.max_rollup_seconds:
+                entry.rollup *= 2
+                entry.frame = rollup(entry.frame, entry.rollup)
+                self.counters['coarsened'] += 1
+
+        # Still too much: drop whole sessions, oldest first
+        for path in finished:
+            if self.nbytes() <= self.budget:
+                return
+            print(f"History budget exceeded, not showing {os.path.basename(path)}")
+            del self.entries[path]
+            self.counters['dropped'] += 1
+
+        # Only the active session is left: keep its newest rows
+        active = self.entries.get(max(requested)) if requested else None
+        if active is not None and self.nbytes() > self.budget:
+            row_bytes = max(active.nbytes / max(len(active.frame), 1), 1)
+            keep = max(int((self.budget - (self.nbytes() - active.nbytes)) / row_bytes), 1)
+            print(f"History budget exceeded, showing only the last {keep} samples")
+            active.frame = active.frame.iloc[-keep:].reset_index(drop=True)
+
+    def nbytes(self):
+        return (sum(entry.nbytes for entry in self.entries.values()) +
+                sum(nbytes() for nbytes, _ in self.tracked.values()))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'budget_bytes': self.budget,
+                'bytes': self.nbytes(),
+                'sessions': {os.path.basename(p): {'rows': len(e.frame), 'rollup_seconds': e.rollup, 'bytes': e.nbytes}
+                             for p, e in self.entries.items()},
+                'tracked': {name: nbytes() for name, (nbytes, _) in self.tracked.items()},
+                'counters': dict(self.counters),
+            }
@@ -0,0 +1,152 @@
+"""
+Network ingest for PiBQ units that push their samples to one dashboard (see uploader.py).
+
+    POST /ingest/<device>   {"session": "20250801_120000", "rows": [[epoch, smoker, meat, ...], ...]}
+
+Values other than the epoch may be null (NaN, e.g. a substituted outlier).
+Rows are stored like a local recording, one folder per device: temperature/<device>/<session>.csv.
+Accepted rows are buffered and appended in batches by a background thread. When the buffer is
+full the request is refused with 503 and a Retry-After header, and the uploader backs off and
+keeps the rows until the dashboard catches up.
+"""
+
+import atexit
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import request, jsonify
+
+from helpers import CSV_COLUMNS, LOCAL_DEVICE
+
+DEVICE_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+SESSION_PATTERN = re.compile(r'^\d{8}_\d{6}$')
+
+
+def format_row(row):
+    # Same layout record_temp.py writes locally; the uploader sends NaN as null
+    return ','.join('nan' if v is None else str(v) for v in row) + '\n'
+
+
+class IngestWriter:
+    """Buffers pushed rows in memory and appends them to the session files in batches."""
+
+    def __init__(self, folder_path, max_pending_rows=20000, flush_interval=2.0):
+        self.folder_path = folder_path
+        self.max_pending_rows = max_pending_rows
+        self.flush_interval = flush_interval
+        self.pending = defaultdict(list)  # file path -> formatted lines
+        self.pending_rows = 0
+        self.lock = threading.Lock()
+        self.last_seen = {}
+        self.counters = {'batches': 0, 'rows': 0, 'rejected': 0, 'writes': 0, 'write_errors': 0}
+        self.pid = None
+
+    def start(self):
+        # Once per process, so every forked gunicorn worker flushes its own buffer
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True).start()
+        atexit.register(self.flush)  # Don't lose accepted rows when the worker shuts down
+
+    def add(self, device, session, rows):
+        """Queue rows for writing. Returns False when the buffer is full (the caller should retry later)."""
+        lines = ''.join(format_row(row) for row in rows)
+        path = os.path.join(self.folder_path, device, session + '.csv')
+        with self.lock:
+            if self.pending_rows + len(rows) > self.max_pending_rows:
+                self.counters['rejected'] += 1
+                return False
+            self.pending[path].append(lines)
+            self.pending_rows += len(rows)
+            self.last_seen[device] = time.time()
+            self.counters['batches'] += 1
+            self.counters['rows'] += len(rows)
+        return True
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(list)
+            self.pending_rows = 0
+        failed, error = {}, None
+        for path, chunks in pending.items():
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # One O_APPEND write per file and flush: lines never interleave with other workers' writes
+                fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, ''.join(chunks).encode('utf-8'))
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                failed[path], error = chunks, e
+                continue
+            self.counters['writes'] += 1
+        if failed:
+            # These rows were already acknowledged, so keep them (ahead of newer ones) for the next flush
+            with self.lock:
+                for path, chunks in failed.items():
+                    self.pending[path][:0] = chunks
+                    self.pending_rows += sum(chunk.count('\n') for chunk in chunks)
+                self.counters['write_errors'] += 1
+            raise error
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Writing pushed samples failed, retrying with the next flush: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {'pending_rows': self.pending_rows, 'last_seen': dict(self.last_seen), 'counters': dict(self.counters)}
+
+
+def _valid_value(value, nullable):
+    if value is None:
+        return nullable
+    # JSON's NaN/Infinity extensions would end up in the CSV and the dashboard's filters
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _valid_rows(rows):
+    """Same-width rows of finite numbers; only the epoch has to be present, other values may be null (NaN)."""
+    if not isinstance(rows, list) or not rows:
+        return False
+    width = len(rows[0]) if isinstance(rows[0], list) else 0
+    if not 3 <= width <= len(CSV_COLUMNS):
+        return False
+    return all(isinstance(row, list) and len(row) == width and
+               all(_valid_value(v, i > 0) for i, v in enumerate(row)) for row in rows)
+
+
+def register_ingest(server, writer, token=None, retry_after=5):
+    """Add POST /ingest/<device>. With a token, pushes must send it in the X-PiBQ-Token header."""
+
+    @server.route('/ingest/<device>', methods=['POST'])
+    def ingest(device):
+        writer.start()
+        if token and request.headers.get('X-PiBQ-Token') != token:
+            return jsonify(error='Invalid token'), 403
+        if not DEVICE_PATTERN.match(device) or device == LOCAL_DEVICE:
+            return jsonify(error=f"Invalid device name '{device}'"), 400
+
+        body = request.get_json(silent=True)
+        body = body if isinstance(body, dict) else {}
+        session, rows = body.get('session'), body.get('rows')
+        if not isinstance(session, str) or not SESSION_PATTERN.match(session) or not _valid_rows(rows):
+            return jsonify(error='Expected {"session": "YYYYMMDD_HHMMSS", "rows": [[epoch, smoker, meat, ...], ...]}'), 400
+
+        if not writer.add(device, session, rows):
+            response = jsonify(error='Ingest buffer full, retry later')
+            response.status_code = 503
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        return jsonify(accepted=len(rows))
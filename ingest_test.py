@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""
+End-to-end test of the multi-unit setup on one machine.
+
+Starts the dashboard and several record_temp.py --simulate --push processes, each in its own
+directory as if it ran on its own Pi. Optionally takes the dashboard down for a while to
+check that the recorders buffer and catch up. At the end every unit's local CSV has to match
+what the dashboard stored for it, and the graph callback has to render all units.
+
+Examples:
+    python ingest_test.py --units 3 --duration 60
+    python ingest_test.py --units 5 --duration 120 --outage 30
+    python ingest_test.py --server-cmd "gunicorn -c $PWD/gunicorn.conf.py app:server"
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from load_test import collect_layout_props, find_graph_callback, launch_server, parse_outputs
+
+
+def start_recorder(unit_dir, url, device):
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(unit_dir, exist_ok=True)
+    return subprocess.Popen([sys.executable, os.path.join(repo_dir, 'record_temp.py'), '--simulate',
+                             '--push', url, '--device', device],
+                            cwd=unit_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def count_rows(pattern):
+    total = 0
+    for path in glob.glob(pattern):
+        with open(path, 'rb') as f:
+            total += f.read().count(b'\n')
+    return total
+
+
+def render_all_units(url):
+    # One graph callback with every unit selected, like a browser opening the dashboard
+    dependencies = requests.get(url + '/_dash-dependencies', timeout=10).json()
+    callback = find_graph_callback(dependencies, 'interval-component.n_intervals')
+    props = {}
+    collect_layout_props(requests.get(url + '/_dash-layout', timeout=10).json(), props)
+
+    def entries(deps):
+        return [{'id': d['id'], 'property': d['property'], 'value': props.get((d['id'], d['property']))}
+                for d in deps]
+    outputs = [{'id': i, 'property': p} for i, p in parse_outputs(callback['output'])]
+    body = {'output': callback['output'], 'outputs': outputs, 'inputs': entries(callback['inputs']),
+            'state': entries(callback.get('state', [])), 'changedPropIds': ['interval-component.n_intervals']}
+    response = requests.post(url + '/_dash-update-component', json=body, timeout=60).json()['response']
+    figure = response['base-figure']['data']
+    return {trace['legendgroup'].rsplit('-', 1)[0] for trace in figure['data'] if trace.get('legendgroup')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test several recorders pushing to one dashboard')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Dashboard base URL')
+    parser.add_argument('--units', type=int, default=3, help='Number of simulated recorders')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds the recorders run')
+    parser.add_argument('--outage', type=float, default=0, help='Stop the dashboard this many seconds mid-run')
+    parser.add_argument('--server-cmd', help='Command used instead of "python app.py"')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    work_dir = tempfile.mkdtemp(prefix='pibq-ingest-')
+    server_dir = os.path.join(work_dir, 'dashboard')
+    os.makedirs(os.path.join(server_dir, 'temperature'))
+    devices = [f"unit{i + 1}" for i in range(args.units)]
+    server, recorders = None, []
+    try:
+        server = launch_server(server_dir, url, args.server_cmd)
+        recorders = [start_recorder(os.path.join(work_dir, d), url, d) for d in devices]
+        print(f"{args.units} recorders pushing to {url} for {args.duration:g} s")
+
+        if args.outage:
+            time.sleep(args.duration / 3)
+            print(f"Stopping the dashboard for {args.outage:g} s")
+            stop_server(server)
+            time.sleep(args.outage)
+            server = launch_server(server_dir, url, args.server_cmd)
+            time.sleep(max(0.0, args.duration * 2 / 3 - args.outage))
+        else:
+            time.sleep(args.duration)
+
+        # SIGTERM lets the recorders send what they still have buffered
+        for recorder in recorders:
+            recorder.send_signal(signal.SIGTERM)
+        for recorder in recorders:
+            recorder.wait(timeout=30)
+        time.sleep(5)  # Let the dashboard flush its ingest buffer
+
+        units = render_all_units(url)
+        metrics = requests.get(url + '/metrics', timeout=10).json()
+    finally:
+        for recorder in recorders:
+            if recorder.poll() is None:
+                recorder.kill()
+        if server:
+            stop_server(server)
+
+    print("\n=== PiBQ ingest test results ===")
+    ok = True
+    for device in devices:
+        recorded = count_rows(os.path.join(work_dir, device, 'temperature', '*.csv'))
+        stored = count_rows(os.path.join(server_dir, 'temperature', device, '*.csv'))
+        match = recorded > 0 and stored == recorded
+        ok &= match
+        print(f"{device}: {recorded} rows recorded, {stored} stored by the dashboard {'OK' if match else 'MISMATCH'}")
+    print(f"Rendered units: {', '.join(sorted(units)) or 'none'}")
+    print(f"Ingest stats (one worker): {metrics.get('ingest')}")
+    ok &= units == set(devices)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+"""
+Multi-client load test for the PiBQ dashboard.
+
+Simulates N dashboard clients that poll the graph callback the same way a
+browser does (one request per dcc.Interval tick), then reports latency
+percentiles, throughput, error rate and server CPU/RSS.
+
+Examples:
+    # Launch app.py against synthetic data and hit it with 20 clients
+    python load_test.py --launch --clients 20 --interval 5 --duration 120
+
+    # Replay a recorded session instead of synthetic data
+    python load_test.py --launch --replay temperature/20250801_120000.csv
+
+    # Benchmark the production server with compression over a ~10 Mbit/s Wi-Fi link
+    python load_test.py --launch --server-cmd "gunicorn -c $PWD/gunicorn.conf.py app:server" \
+        --accept-encoding br --link-mbps 10
+
+    # Test an already running server (pass its PID to get CPU/RSS)
+    python load_test.py --url http://PiBQ.local:8000 --server-pid 1234
+"""
+
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from config import load_config
+
+SAMPLE_PERIOD = 1.1  # Same cadence as record_temp.py
+
+
+# --- Test data -------------------------------------------------------------
+
+def synthetic_sample(t):
+    # Smoker settles around 120°C with some wobble, meat climbs slowly and stalls
+    smoker = 120 - 95 * np.exp(-t / 900.0) + 3 * np.sin(t / 120.0) + random.gauss(0, 0.8)
+    meat = 20 + 50 * (1 - np.exp(-t / 5400.0)) + random.gauss(0, 0.3)
+    return smoker, meat
+
+
+def load_replay(path):
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) >= 3:
+                rows.append((float(parts[1]), float(parts[2])))
+    if not rows:
+        raise ValueError(f"No samples found in {path}")
+    return rows
+
+
+class DataFeeder(threading.Thread):
+    """Writes history into a session CSV and keeps appending like the recorder."""
+
+    def __init__(self, data_dir, history_minutes, replay_rows=None):
+        super().__init__(daemon=True)
+        self.replay_rows = replay_rows
+        self.stop_event = threading.Event()
+        self.index = 0
+
+        temperature_dir = os.path.join(data_dir, 'temperature')
+        os.makedirs(temperature_dir, exist_ok=True)
+        start = time.time() - history_minutes * 60
+        filename = time.strftime('%Y%m%d_%H%M%S', time.localtime(start)) + '.csv'
+        self.path = os.path.join(temperature_dir, filename)
+
+        self.start_epoch = start
+        with open(self.path, 'w', encoding='utf-8') as f:
+            epoch = start
+            while epoch < time.time():
+                f.write(self._row(epoch))
+                epoch += SAMPLE_PERIOD
+
+    def _row(self, epoch):
+        if self.replay_rows:
+            smoker, meat = self.replay_rows[self.index % len(self.replay_rows)]
+        else:
+            smoker, meat = synthetic_sample(epoch - self.start_epoch)
+        self.index += 1
+        return f"{epoch},{smoker},{meat}\n"
+
+    def run(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while not self.stop_event.wait(SAMPLE_PERIOD):
+                f.write(self._row(time.time()))
+                f.flush()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def launch_server(data_dir, url, server_cmd=None):
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    cmd = server_cmd.split() if server_cmd else [sys.executable, os.path.join(repo_dir, 'app.py')]
+    # The server runs inside the data dir (it reads ./temperature/), the code comes from the repo
+    env = dict(os.environ, PYTHONPATH=repo_dir)
+    proc = subprocess.Popen(cmd, cwd=data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            requests.get(url + '/_dash-layout', timeout=2)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("Server did not come up within 60 s")
+
+
+# --- Server resource sampling ----------------------------------------------
+
+def process_tree(pid):
+    # The server itself plus any worker processes it forked
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        pids.append(p)
+        stack.extend(children.get(p, []))
+    return pids
+
+
+def read_cpu_rss(pids):
+    ticks, rss_pages = 0, 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                rss_pages += int(f.read().split()[1])
+        except OSError:
+            continue
+        ticks += int(fields[11]) + int(fields[12])  # utime + stime
+    return ticks / os.sysconf('SC_CLK_TCK'), rss_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, pid, period=1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.period = period
+        self.stop_event = threading.Event()
+        self.cpu_percent = []
+        self.rss_bytes = []
+
+    def run(self):
+        last_cpu, last_time = read_cpu_rss(process_tree(self.pid))[0], time.monotonic()
+        while not self.stop_event.wait(self.period):
+            cpu, rss = read_cpu_rss(process_tree(self.pid))
+            now = time.monotonic()
+            self.cpu_percent.append(100.0 * (cpu - last_cpu) / (now - last_time))
+            self.rss_bytes.append(rss)
+            last_cpu, last_time = cpu, now
+
+    def stop(self):
+        self.stop_event.set()
+
+
+# --- Simulated clients -----------------------------------------------------
+
+def collect_layout_props(node, props):
+    # Walk the serialized layout and remember every component property by id
+    if isinstance(node, list):
+        for child in node:
+            collect_layout_props(child, props)
+    elif isinstance(node, dict) and 'props' in node:
+        node_props = node['props']
+        if 'id' in node_props:
+            for key, value in node_props.items():
+                props[(node_props['id'], key)] = value
+        collect_layout_props(node_props.get('children'), props)
+
+
+def find_graph_callback(dependencies, trigger):
+    for dep in dependencies:
+        if dep.get('clientside_function'):
+            continue
+        if any(f"{i['id']}.{i['property']}" == trigger for i in dep['inputs']):
+            return dep
+    raise RuntimeError(f"No server callback listens to {trigger}")
+
+
+def parse_outputs(output):
+    # "..a.figure...b.children.." -> [("a", "figure"), ("b", "children")]
+    parts = output.strip('.').split('...') if output.startswith('..') else [output]
+    return [tuple(p.rsplit('.', 1)) for p in parts]
+
+
+class Client(threading.Thread):
+    """One dashboard viewer: keeps its own component state and polls on a timer."""
+
+    def __init__(self, url, callback, layout_props, interval, trigger, stop_event, results, accept_encoding):
+        super().__init__(daemon=True)
+        self.url = url + '/_dash-update-component'
+        self.callback = callback
+        self.props = dict(layout_props)
+        self.interval = interval
+        self.trigger_id, self.trigger_prop = trigger.rsplit('.', 1)
+        self.stop_event = stop_event
+        self.results = results
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = accept_encoding
+
+    def payload(self, changed):
+        def entries(deps):
+            return [{'id': d['id'], 'property': d['property'], 'value': self.props.get((d['id'], d['property']))}
+                    for d in deps]
+        outputs = [{'id': i, 'property': p} for i, p in parse_outputs(self.callback['output'])]
+        return {
+            'output': self.callback['output'],
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': entries(self.callback['inputs']),
+            'state': entries(self.callback.get('state', [])),
+            'changedPropIds': [changed],
+        }
+
+    def request(self, changed):
+        start = time.perf_counter()
+        try:
+            resp = self.session.post(self.url, json=self.payload(changed), timeout=60, stream=True)
+            body = resp.json() if resp.status_code == 200 else None
+            wire_bytes = resp.raw.tell()  # Bytes on the wire, i.e. before decompression
+            ok = resp.status_code in (200, 204)  # 204 = callback skipped the update
+        except (requests.RequestException, ValueError):
+            self.results.append((time.time(), time.perf_counter() - start, False, 0))
+            return
+        latency = time.perf_counter() - start
+        self.results.append((time.time(), latency, ok, wire_bytes))
+
+        # Keep the returned props (e.g. stores) so the next poll sends them back like a browser
+        if body:
+            for component_id, props in body.get('response', {}).items():
+                for prop, value in props.items():
+                    self.props[(component_id, prop)] = value
+
+    def run(self):
+        # Initial page load fires the callback once, then the interval takes over
+        self.request(f"{self.trigger_id}.{self.trigger_prop}")
+        # Random phase so clients don't tick in lockstep
+        next_tick = time.monotonic() + random.uniform(0, self.interval)
+        while not self.stop_event.is_set():
+            if self.stop_event.wait(max(0.0, next_tick - time.monotonic())):
+                break
+            key = (self.trigger_id, self.trigger_prop)
+            self.props[key] = (self.props.get(key) or 0) + 1
+            self.request(f"{self.trigger_id}.{self.trigger_prop}")
+            next_tick += self.interval
+
+
+# --- Reporting -------------------------------------------------------------
+
+def report(results, duration, sampler, link_mbps=0):
+    latencies = np.array([r[1] for r in results if r[2]])
+    errors = sum(1 for r in results if not r[2])
+    total = len(results)
+    wire = np.array([r[3] for r in results if r[2]])
+
+    print("\n=== PiBQ load test results ===")
+    print(f"Requests:    {total} in {duration:.1f} s ({total / duration:.2f} req/s)")
+    print(f"Errors:      {errors} ({100.0 * errors / max(total, 1):.1f}%)")
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        print(f"Latency:     p50 {p50:.0f} ms | p95 {p95:.0f} ms | p99 {p99:.0f} ms | max {latencies.max() * 1000:.0f} ms")
+        print(f"Response:    {wire.mean() / 1024:.1f} KiB avg on the wire, {wire.sum() / duration / 1024:.1f} KiB/s total")
+        if link_mbps:
+            # Localhost has no transfer cost, add what the response bytes would take over the link
+            on_link = latencies + wire * 8 / (link_mbps * 1e6)
+            p50, p95, p99 = np.percentile(on_link, [50, 95, 99]) * 1000
+            print(f"@{link_mbps:g} Mbit/s: p50 {p50:.0f} ms | p95 {p95:.0f} ms | p99 {p99:.0f} ms (estimated)")
+    if sampler and sampler.cpu_percent:
+        cpu = np.array(sampler.cpu_percent)
+        rss = np.array(sampler.rss_bytes) / 2**20
+        print(f"Server CPU:  avg {cpu.mean():.0f}% | max {cpu.max():.0f}% (100% = one core)")
+        print(f"Server RSS:  start {rss[0]:.0f} MiB | max {rss.max():.0f} MiB | end {rss[-1]:.0f} MiB")
+
+
+def main():
+    config = load_config()
+
+    parser = argparse.ArgumentParser(description='Load test the PiBQ dashboard callback endpoint')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Dashboard base URL')
+    parser.add_argument('--clients', type=int, default=10, help='Number of concurrent clients')
+    parser.add_argument('--interval', type=float, default=config['update']['interval_seconds'],
+                        help='Seconds between polls per client (dashboard default from defaults.yaml)')
+    parser.add_argument('--duration', type=float, default=120, help='Test duration in seconds')
+    parser.add_argument('--ramp', type=float, default=10, help='Seconds over which clients join')
+    parser.add_argument('--trigger', default='interval-component.n_intervals', help='Input that each poll changes')
+    parser.add_argument('--accept-encoding', default='identity', help='Accept-Encoding sent by clients (e.g. gzip, br)')
+    parser.add_argument('--link-mbps', type=float, default=0,
+                        help='Also estimate latency over a link of this speed (e.g. 10 for typical Pi Wi-Fi)')
+    parser.add_argument('--server-pid', type=int, help='PID of a running server to sample CPU/RSS from')
+    parser.add_argument('--launch', action='store_true', help='Start app.py locally against test data')
+    parser.add_argument('--server-cmd', help='Command used with --launch instead of "python app.py"')
+    parser.add_argument('--replay', help='CSV session to replay as test data (default: synthetic)')
+    parser.add_argument('--idle', action='store_true', help='Write the history but no new samples (finished cook)')
+    parser.add_argument('--history-minutes', type=float, default=120, help='Minutes of history written before the test')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    server, feeder, data_dir = None, None, None
+
+    try:
+        if args.launch:
+            data_dir = tempfile.mkdtemp(prefix='pibq-load-')
+            replay_rows = load_replay(args.replay) if args.replay else None
+            feeder = DataFeeder(data_dir, args.history_minutes, replay_rows)
+            if not args.idle:
+                feeder.start()
+            print(f"Test data in {feeder.path}, starting server...")
+            server = launch_server(data_dir, url, args.server_cmd)
+
+        dependencies = requests.get(url + '/_dash-dependencies', timeout=10).json()
+        callback = find_graph_callback(dependencies, args.trigger)
+        layout_props = {}
+        collect_layout_props(requests.get(url + '/_dash-layout', timeout=10).json(), layout_props)
+
+        server_pid = server.pid if server else args.server_pid
+        sampler = ResourceSampler(server_pid) if server_pid else None
+        if sampler:
+            sampler.start()
+
+        print(f"Running {args.clients} clients, one poll every {args.interval:g} s, for {args.duration:g} s")
+        stop_event = threading.Event()
+        results = []
+        clients = []
+        start = time.monotonic()
+        for i in range(args.clients):
+            client = Client(url, callback, layout_props, args.interval, args.trigger,
+                            stop_event, results, args.accept_encoding)
+            clients.append(client)
+            client.start()
+            time.sleep(args.ramp / max(args.clients, 1))
+
+        time.sleep(max(0.0, args.duration - (time.monotonic() - start)))
+        stop_event.set()
+        for client in clients:
+            client.join(timeout=60)
+        if sampler:
+            sampler.stop()
+
+        report(results, time.monotonic() - start, sampler, args.link_mbps)
+
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if feeder:
+            feeder.stop()
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
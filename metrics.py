@@ -0,0 +1,122 @@
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from flask import jsonify
+
+
+def read_rss():
+    """(current, peak) resident set size in bytes from /proc, (None, None) where there is no /proc."""
+    values = {}
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':', 1)
+                    values[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+class MemorySampler:
+    """
+    Samples the process's RSS (and, when enabled, tracemalloc's view of Python allocations) in a
+    background thread and keeps a bounded history, so a slow leak shows up as a slope long before
+    the Pi runs out of memory.
+    """
+
+    def __init__(self, interval_seconds=30, history=240, tracemalloc_frames=0, top_n=10):
+        self.interval = interval_seconds
+        self.samples = deque(maxlen=history)
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top_n = top_n
+        self.top_allocations = []
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def start(self):
+        # Safe to call on every request: starts once per process, so every forked worker gets its own thread
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.samples.clear()
+        if self.tracemalloc_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Memory sampling failed: {e}")
+            time.sleep(self.interval)
+
+    def sample(self):
+        rss, peak_rss = read_rss()
+        sample = {'time': time.time(), 'rss_bytes': rss, 'peak_rss_bytes': peak_rss, 'gc_counts': gc.get_count()}
+        top = None
+        if tracemalloc.is_tracing():
+            sample['traced_bytes'], sample['traced_peak_bytes'] = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().statistics('lineno')[:self.top_n]
+            top = [{'where': str(s.traceback[0]), 'bytes': s.size, 'count': s.count} for s in stats]
+        with self.lock:
+            self.samples.append(sample)
+            if top is not None:
+                self.top_allocations = top
+        return sample
+
+    def rss_slope(self):
+        # Least-squares RSS growth in bytes per hour over the sample history
+        with self.lock:
+            points = [(s['time'], s['rss_bytes']) for s in self.samples if s['rss_bytes'] is not None]
+        if len(points) < 3:
+            return None
+        t0 = points[0][0]
+        n = len(points)
+        mean_t = sum(t - t0 for t, _ in points) / n
+        mean_r = sum(r for _, r in points) / n
+        var_t = sum((t - t0 - mean_t) ** 2 for t, _ in points)
+        if var_t == 0:
+            return None
+        cov = sum((t - t0 - mean_t) * (r - mean_r) for t, r in points)
+        return cov / var_t * 3600
+
+    def snapshot(self):
+        with self.lock:
+            samples = list(self.samples)
+            top = list(self.top_allocations)
+        rss = [s['rss_bytes'] for s in samples if s['rss_bytes'] is not None]
+        return {
+            'pid': os.getpid(),
+            'latest': samples[-1] if samples else None,
+            'rss_min_bytes': min(rss) if rss else None,
+            'rss_max_bytes': max(rss) if rss else None,
+            'rss_slope_bytes_per_hour': self.rss_slope(),
+            'samples': len(samples),
+            'top_allocations': top,
+        }
+
+
+def register_metrics(server, sampler, sources=None):
+    """
+    Serve memory metrics as JSON at /metrics. `sources` maps extra section names to functions
+    returning a dict (e.g. the history cache stats). Each gunicorn worker answers with its own numbers.
+    """
+    sources = sources or {}
+
+    @server.before_request
+    def start_sampler():
+        sampler.start()
+
+    @server.route('/metrics')
+    def metrics():
+        body = {'memory': sampler.snapshot()}
+        for name, source in sources.items():
+            body[name] = source()
+        return jsonify(body)
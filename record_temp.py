@@ -1,31 +1,154 @@
 #!/usr/bin/env python
 
-import mcp9600
+import argparse
 from datetime import datetime
 import time
 import os
+import signal
+import socket
+import sys
+from config import load_config
+from alerts import build_alert_engine
+from cook_phase import build_phase_detector, write_state_file
+from telemetry import RecorderTelemetry
+from filters import build_filters, CICDecimator
+from sensors import build_probes
+from uploader import Uploader
 
-# https://github.com/pimoroni/mcp9600-python/blob/master/REFERENCE.md#function-reference
+PROBES = ('smoker', 'meat')
 
-smoker_sensor = mcp9600.MCP9600(i2c_addr=0x66)
-smoker_sensor.set_thermocouple_type('K')
 
-meat_sensor = mcp9600.MCP9600(i2c_addr=0x67)
-meat_sensor.set_thermocouple_type('K')
+def read_probe(probe, sensor, telemetry):
+    # Time each I2C read, a failed read skips the sample instead of crashing the recorder
+    start = time.perf_counter()
+    try:
+        temperature = sensor.read()
+    except OSError as e:
+        telemetry.record_read(probe, time.perf_counter() - start, ok=False)
+        print(f"Reading {probe} probe failed: {e}")
+        return None
+    telemetry.record_read(probe, time.perf_counter() - start)
+    return temperature
 
-filename = datetime.now().strftime('%Y%m%d_%H%M%S') + ".csv"
-dir_path = './temperature/'
-if not os.path.exists(dir_path):
-    os.makedirs(dir_path)
 
-with open(os.path.join(dir_path, filename), 'w', encoding = 'utf-8') as f:
-    while True:
-        unix_epoch = time.time()
+def main():
+    parser = argparse.ArgumentParser(description='Record PiBQ probe temperatures')
+    parser.add_argument('--simulate', action='store_true', help='Use simulated probes instead of the MCP9600s')
+    parser.add_argument('--output-dir', default='./temperature/', help='Where session CSVs are written')
+    parser.add_argument('--push', metavar='URL', help='Also push samples to a PiBQ dashboard, e.g. http://pibq.local:8000')
+    parser.add_argument('--device', default=socket.gethostname(), help='Name of this unit on the dashboard (with --push)')
+    args = parser.parse_args()
 
-        smoker_temp = smoker_sensor.get_hot_junction_temperature()
-        meat_temp = meat_sensor.get_hot_junction_temperature()
+    config = load_config()
+    recorder_config = config['recorder']
 
-        f.write(f"{unix_epoch},{smoker_temp},{meat_temp}\n")
-        f.flush()
+    sensors = build_probes(config, simulate=args.simulate)
 
-        time.sleep(1.1) # So we can disregard milliseconds in the app.py code
+    filename = datetime.now().strftime('%Y%m%d_%H%M%S') + ".csv"
+    dir_path = args.output_dir
+    if not os.path.exists(dir_path):
+        os.makedirs(dir_path)
+    # Status and cook state live next to the session CSVs, so several recorders can share a machine
+    status_file = os.path.join(dir_path, os.path.basename(recorder_config['status_file']))
+    state_file = os.path.join(dir_path, os.path.basename(config['cook_phase']['state_file']))
+
+    uploader = None
+    if args.push:
+        push_config = config['push']
+        uploader = Uploader(args.push, args.device, os.path.splitext(filename)[0],
+                            batch_size=push_config['batch_size'],
+                            flush_interval=push_config['flush_interval_seconds'],
+                            max_buffer_rows=push_config['max_buffer_rows'],
+                            timeout=push_config['timeout_seconds'],
+                            max_backoff=push_config['max_backoff_seconds'],
+                            token=push_config.get('token'))
+        uploader.start()
+        # systemd stops us with SIGTERM; exit through the finally below so buffered rows get sent
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    alert_engine = build_alert_engine(config)
+    phase_detector = build_phase_detector(config)
+    last_state_write = 0
+    probe_filters = build_filters(config)
+
+    # Oversampling: read every period/oversample seconds and decimate back to one row per period
+    period = recorder_config['sample_period_seconds']
+    oversample = recorder_config['oversample']
+    read_period = period / oversample
+    decimators = {probe: {kind: CICDecimator(oversample, recorder_config['cic_order']) for kind in ('clean', 'raw')}
+                  for probe in PROBES}
+
+    telemetry = RecorderTelemetry(status_file, period,
+                                  gap_factor=recorder_config['gap_factor'],
+                                  write_interval=recorder_config['status_interval_seconds'],
+                                  loop_period=read_period)
+    telemetry.start_writer()
+
+    try:
+        with open(os.path.join(dir_path, filename), 'w', encoding = 'utf-8') as f:
+            next_deadline = time.monotonic()
+            while True:
+                loop_start = time.monotonic()
+                read_epoch = time.time()
+
+                # Filter every reading at the oversampled rate, then decimate. A failed read (None)
+                # goes to the decimators too, so both probes stay in step; they fill it in from the
+                # interval's other reads, or give no row when none of them succeeded.
+                outputs = {}
+                for probe in PROBES:
+                    raw = read_probe(probe, sensors[probe], telemetry)
+                    clean, flag = raw, 0
+                    if probe_filters and raw is not None:
+                        clean, flag = probe_filters[probe].update(raw)
+                    outputs[probe] = (decimators[probe]['clean'].add(clean, read_epoch, flag),
+                                      decimators[probe]['raw'].add(raw, read_epoch))
+
+                if all(c is not None and r is not None for c, r in outputs.values()):
+                    # Both decimators of a probe get the same reads, so they agree on the epoch
+                    (unix_epoch, smoker_temp, smoker_min, smoker_max, smoker_flags), (_, smoker_raw, _, _, _) = outputs['smoker']
+                    (_, meat_temp, meat_min, meat_max, meat_flags), (_, meat_raw, _, _, _) = outputs['meat']
+
+                    # Row: epoch, cleaned temps, raw temps, outlier and failed-read counts, cleaned min/max
+                    # of the interval. 4 decimals is well below the MCP9600's 0.0625°C resolution.
+                    row = [unix_epoch] + [round(v, 4) for v in (smoker_temp, meat_temp, smoker_raw, meat_raw)] + \
+                          [smoker_flags, meat_flags] + [round(v, 4) for v in (smoker_min, smoker_max, meat_min, meat_max)]
+                    f.write(','.join(str(v) for v in row) + '\n')
+                    f.flush()
+                    telemetry.record_sample(unix_epoch)
+                    if uploader:
+                        uploader.add(row)
+
+                    if alert_engine:
+                        try:
+                            alert_engine.process(unix_epoch, {'smoker': smoker_temp, 'meat': meat_temp})
+                        except Exception as e:
+                            # Never let alerting stop the recording
+                            print(f"Alert processing failed: {e}")
+
+                    if phase_detector:
+                        try:
+                            phase_event = phase_detector.update(unix_epoch, smoker_temp, meat_temp)
+                            if phase_event and alert_engine:
+                                alert_engine.dispatch(phase_event)
+                            if phase_event or unix_epoch - last_state_write >= config['cook_phase']['write_interval_seconds']:
+                                write_state_file(state_file, phase_detector.state())
+                                last_state_write = unix_epoch
+                        except Exception as e:
+                            print(f"Cook phase detection failed: {e}")
+
+                telemetry.record_loop(time.monotonic() - loop_start)
+
+                # Fixed cadence: sleep until the next slot; after an overrun start again from now
+                # instead of firing a burst of samples to catch up
+                next_deadline += read_period
+                now = time.monotonic()
+                if now > next_deadline:
+                    next_deadline = now
+                time.sleep(next_deadline - now)
+    finally:
+        if uploader:
+            uploader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+from collections import deque
+
+
+class RollingWindow:
+    """
+    Time-based sliding window over (timestamp, value) samples.
+    Keeps running sums so mean, variance and least-squares slope are O(1) per sample
+    (each sample is added and removed exactly once).
+    """
+
+    def __init__(self, window_seconds):
+        self.window_seconds = window_seconds
+        self.samples = deque()
+        self.t0 = None  # Reference time, keeps the sums small
+        self.n = 0
+        self.sum_t = self.sum_v = self.sum_tt = self.sum_tv = self.sum_vv = 0.0
+
+    def add(self, epoch, value):
+        if self.t0 is None:
+            self.t0 = epoch
+        t = epoch - self.t0
+        self.samples.append((t, value))
+        self._accumulate(t, value, 1)
+
+        # Drop samples that fell out of the window
+        while self.samples and t - self.samples[0][0] > self.window_seconds:
+            old_t, old_v = self.samples.popleft()
+            self._accumulate(old_t, old_v, -1)
+
+    def _accumulate(self, t, v, sign):
+        self.n += sign
+        self.sum_t += sign * t
+        self.sum_v += sign * v
+        self.sum_tt += sign * t * t
+        self.sum_tv += sign * t * v
+        self.sum_vv += sign * v * v
+
+    def span(self):
+        # Seconds covered by the samples currently in the window
+        return self.samples[-1][0] - self.samples[0][0] if self.samples else 0.0
+
+    def mean(self):
+        return self.sum_v / self.n if self.n else None
+
+    def variance(self):
+        if self.n < 2:
+            return None
+        return max(0.0, self.sum_vv / self.n - (self.sum_v / self.n) ** 2)
+
+    def slope(self):
+        # Least-squares slope in value units per second
+        if self.n < 2:
+            return None
+        denominator = self.n * self.sum_tt - self.sum_t ** 2
+        if denominator <= 0:
+            return None
+        return (self.n * self.sum_tv - self.sum_t * self.sum_v) / denominator
+
+    def level(self):
+        # Value of the fitted line at the newest sample, less noisy than the raw last reading
+        slope = self.slope()
+        if slope is None:
+            return self.mean()
+        return self.mean() + slope * (self.samples[-1][0] - self.sum_t / self.n)
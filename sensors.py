@@ -0,0 +1,55 @@
+import math
+import random
+import time
+
+# https://github.com/pimoroni/mcp9600-python/blob/master/REFERENCE.md#function-reference
+
+
+class MCP9600Probe:
+    """K-type thermocouple on an MCP9600 amplifier over I2C."""
+
+    def __init__(self, i2c_addr, thermocouple_type='K'):
+        import mcp9600  # Only needed on the Pi, simulated runs work without it
+        self.sensor = mcp9600.MCP9600(i2c_addr=i2c_addr)
+        self.sensor.set_thermocouple_type(thermocouple_type)
+
+    def read(self):
+        return self.sensor.get_hot_junction_temperature()
+
+
+class SimulatedProbe:
+    """
+    Stand-in for a probe when there is no hardware: a first-order approach from ambient to a
+    setpoint with Gaussian noise and the occasional wild reading, like a flaky thermocouple.
+    """
+
+    def __init__(self, setpoint, time_constant, ambient=20.0, noise=0.5, spike_probability=0.002,
+                 read_latency=0.0, seed=None):
+        self.setpoint = setpoint
+        self.time_constant = time_constant
+        self.ambient = ambient
+        self.noise = noise
+        self.spike_probability = spike_probability
+        self.read_latency = read_latency
+        self.random = random.Random(seed)
+        self.start = time.time()
+
+    def read(self):
+        if self.read_latency:
+            time.sleep(self.read_latency)
+        t = time.time() - self.start
+        value = self.setpoint - (self.setpoint - self.ambient) * math.exp(-t / self.time_constant)
+        if self.random.random() < self.spike_probability:
+            return self.random.choice([-200.0, 1370.0, value + 30])
+        return value + self.random.gauss(0, self.noise)
+
+
+def build_probes(config, simulate=False):
+    """Probe backends by name from the 'probes' section of defaults.yaml."""
+    probes = {}
+    for name, probe_config in config['probes'].items():
+        if simulate:
+            probes[name] = SimulatedProbe(**probe_config['simulated'])
+        else:
+            probes[name] = MCP9600Probe(probe_config['i2c_addr'], probe_config.get('thermocouple_type', 'K'))
+    return probes
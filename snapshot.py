@@ -0,0 +1,225 @@
+"""
+Server-rendered chart snapshots for clients too weak for the Dash page (old tablets, e-ink displays).
+
+    GET /snapshot.png?width=800&height=480
+    GET /snapshot.svg
+    GET /snapshot       plain HTML page showing the PNG and reloading itself, no JavaScript needed
+
+Parameters (all optional, defaults from defaults.yaml):
+    width, height       image size in pixels
+    devices             comma separated units to show (default all)
+    past_minutes, forecast_minutes, previous_days, utc_offset, smoker_target, meat_minimum
+                        like the dashboard sidebar
+
+Renders are cached on disk per data version and parameters. A render happens under a file lock
+shared by all gunicorn workers, and the cache is checked again once the lock is held, so a new
+data watermark is rendered once however many clients poll it. While the recorder is running the
+version changes with every sample, so a cached render is also reused for min_interval seconds.
+Repeated polls of an unchanged image get a 304.
+"""
+
+import fcntl
+import glob
+import hashlib
+import html
+import importlib.util
+import os
+import threading
+import time
+from io import BytesIO
+from urllib.parse import urlencode
+
+from flask import Response, request, abort
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+SIZE_LIMITS = (160, 2400)  # Pixels, for width and height
+
+
+class SnapshotCache:
+    """Rendered images on disk, newest max_files kept."""
+
+    def __init__(self, cache_dir, max_files=50, min_interval=30):
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.counters = {'renders': 0, 'hits': 0, 'not_modified': 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _recent(self, params_key, fmt):
+        # Newest render of the same parameters, if it is younger than min_interval
+        paths = glob.glob(os.path.join(self.cache_dir, f"{params_key}_*.{fmt}"))
+        if not paths or not self.min_interval:
+            return None
+        newest = max(paths, key=os.path.getmtime)
+        return newest if time.time() - os.path.getmtime(newest) < self.min_interval else None
+
+    def get(self, params_key, version, fmt, render):
+        """Path of the image for these parameters and data version, rendered with render(fmt) if needed."""
+        path = os.path.join(self.cache_dir, f"{params_key}_{hashlib.sha1(version.encode()).hexdigest()[:12]}.{fmt}")
+        cached = path if os.path.exists(path) else self._recent(params_key, fmt)
+        if cached:
+            self._count('hits')
+            return cached
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, '.render.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have rendered it while we waited
+            cached = path if os.path.exists(path) else self._recent(params_key, fmt)
+            if cached:
+                self._count('hits')
+                return cached
+            data = render(fmt)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Readers never see a half-written file
+            self._count('renders')
+            self._prune()
+        return path
+
+    def _prune(self):
+        paths = [p for fmt in FORMATS for p in glob.glob(os.path.join(self.cache_dir, f"*.{fmt}"))]
+        for path in sorted(paths, key=os.path.getmtime)[:-self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def _thin(df, max_points):
+    # Every k-th sample; more points than pixel columns only makes the render slower
+    step = max(1, len(df) // max_points)
+    return df.iloc[::step] if step > 1 else df
+
+
+def render_chart(units, fmt, width, height, smoker_target=None, meat_minimum=None):
+    """
+    Draw the dashboard chart with matplotlib. units is a list of (label or None, df, forecasts,
+    palette) as built for the Dash figure. Returns the image bytes.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib import dates as mdates
+
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi, facecolor='white')
+    ax = fig.add_subplot()
+    ax.set_facecolor('#fafafa')
+    y_min, y_max = float('inf'), float('-inf')
+    window_start, window_end = None, None
+    current = []
+    for label, df, forecasts, palette in units:
+        df_window = forecasts['window']
+        for probe in ('smoker', 'meat'):
+            full_color, window_color, pred_color = palette[probe]
+            name = f"{probe.capitalize()} ({label})" if label else probe.capitalize()  # The font has no emoji
+            history = _thin(df, width * 2)
+            window = _thin(df_window, width)
+            ax.plot(history['datetime'], history[f'{probe}_temp'], color=full_color, linewidth=1.5, label=name)
+            ax.plot(window['datetime'], window[f'{probe}_temp'], color=window_color, linewidth=1.5)
+            forecast, upper_bound, lower_bound = forecasts[probe]
+            if len(forecast):
+                ax.plot(forecasts['times'], forecast, color=pred_color, linewidth=1.2, linestyle=':')
+                ax.fill_between(forecasts['times'], lower_bound, upper_bound, color=pred_color, alpha=0.2, linewidth=0)
+                y_min, y_max = min(y_min, forecast.min() - 2), max(y_max, forecast.max() + 2)
+            y_min = min(y_min, df[f'{probe}_temp'].min() - 5)
+            y_max = max(y_max, df[f'{probe}_temp'].max() + 5)
+            current.append(f"{name} {df[f'{probe}_temp'].iloc[-1]:.1f}°C")
+        start, end = df_window['datetime'].iloc[0], df_window['datetime'].iloc[-1]
+        window_start = start if window_start is None else min(window_start, start)
+        window_end = end if window_end is None else max(window_end, end)
+
+    # Analysis window box and target lines, as on the dashboard
+    ax.axvspan(window_start, window_end, color=(75 / 255, 176 / 255, 214 / 255), alpha=0.1)
+    for value, color, text in ((smoker_target, units[0][3]['smoker'][0], 'Target'),
+                               (meat_minimum, units[0][3]['meat'][0], 'Min')):
+        if value is not None:
+            ax.axhline(value, color=color, linewidth=1.2, linestyle='--')
+            ax.annotate(f"{text}: {value}°C", (1, value), xycoords=('axes fraction', 'data'),
+                        ha='right', va='bottom', fontsize=8)
+            y_min, y_max = min(y_min, value - 10), max(y_max, value + 10)
+
+    ax.set_ylim(y_min, y_max)
+    ax.set_ylabel('Temperature (°C)')
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    ax.grid(color='#e0e0e0', linewidth=0.8)
+    ax.legend(loc='upper left', fontsize=8)
+    ax.set_title('   '.join(current), fontsize=9, loc='left')
+    fig.autofmt_xdate(rotation=90, ha='center')
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
+
+
+def _number_arg(name, default, low, high, cast=int):
+    if name not in request.args:
+        return default
+    try:
+        value = cast(request.args[name])
+    except ValueError:
+        abort(400, f"Invalid {name}: {request.args[name]}")
+    if not low <= value <= high:
+        abort(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def register_snapshot(server, cache, version, units, defaults, constraints, refresh_seconds=60):
+    """
+    Add /snapshot, /snapshot.png and /snapshot.svg. version(**params) returns the dashboard's data
+    version for the parameters and units(**params) the data to draw (see render_chart); defaults
+    and constraints hold the value and (min, max) of each parameter.
+    """
+
+    def parse_params():
+        params = {name: _number_arg(name, defaults[name], *constraints[name])
+                  for name in ('past_minutes', 'forecast_minutes', 'previous_days', 'utc_offset')}
+        params['devices'] = [d for d in request.args.get('devices', '').split(',') if d] or None
+        return params
+
+    @server.route('/snapshot.<fmt>')
+    def snapshot_image(fmt):
+        if fmt not in FORMATS:
+            abort(404)
+        if importlib.util.find_spec('matplotlib') is None:  # Imported only when rendering
+            abort(501, "Snapshots need matplotlib installed")
+        width = _number_arg('width', 800, *SIZE_LIMITS)
+        height = _number_arg('height', 480, *SIZE_LIMITS)
+        targets = {name: _number_arg(name, defaults[name], *constraints[name], cast=float)
+                   for name in ('smoker_target', 'meat_minimum')}
+        params = parse_params()
+
+        params_key = hashlib.sha1(repr((width, height, sorted(targets.items()), sorted(params.items()))).encode()).hexdigest()[:16]
+
+        def render(fmt):
+            data = units(**params)
+            if not data:
+                abort(404, "No temperature data available")
+            return render_chart(data, fmt, width, height, **targets)
+
+        path = cache.get(params_key, version(**params), fmt, render)
+        with open(path, 'rb') as f:
+            response = Response(f.read(), mimetype=FORMATS[fmt])
+        response.set_etag(os.path.basename(path))
+        response.cache_control.no_cache = True  # Revalidate each poll, a 304 costs next to nothing
+        response = response.make_conditional(request)
+        if response.status_code == 304:
+            cache._count('not_modified')
+        return response
+
+    @server.route('/snapshot')
+    def snapshot_page():
+        src = '/snapshot.png' + ('?' + urlencode(request.args) if request.args else '')
+        page = (f'<!DOCTYPE html><html><head><meta charset="utf-8"><meta http-equiv="refresh" content="{refresh_seconds}">'
+                f'<title>PiBQ</title></head><body style="margin:0;background:#fff">'
+                f'<img src="{html.escape(src)}" alt="PiBQ chart" style="width:100%"></body></html>')
+        return Response(page, mimetype='text/html')
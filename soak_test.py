@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Soak test for the dashboard's memory use.
+
+Writes several days of session history, starts the dashboard against it with a live session
+being appended, and polls it for a long time with previous_days covering the whole history.
+Memory is sampled over the server's process tree; after a warm-up RSS has to stay flat.
+Exits non-zero when it grows more than --max-growth-mb.
+
+Examples:
+    python soak_test.py --days 3 --duration 1800
+    python soak_test.py --server-cmd "gunicorn -c $PWD/gunicorn.conf.py app:server" --duration 3600
+    python soak_test.py --replay temperature/20250801_120000.csv --days 5
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from load_test import (SAMPLE_PERIOD, DataFeeder, ResourceSampler, Client, collect_layout_props,
+                       find_graph_callback, launch_server, load_replay, synthetic_sample)
+
+
+def write_previous_days(data_dir, days, session_hours, replay_rows=None):
+    # One session per previous day, starting at noon
+    temperature_dir = os.path.join(data_dir, 'temperature')
+    os.makedirs(temperature_dir, exist_ok=True)
+    for day in range(1, days + 1):
+        start = time.mktime(time.localtime(time.time() - day * 86400)[:3] + (12, 0, 0, 0, 0, -1))
+        path = os.path.join(temperature_dir, time.strftime('%Y%m%d_%H%M%S', time.localtime(start)) + '.csv')
+        n = int(session_hours * 3600 / SAMPLE_PERIOD)
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(n):
+                if replay_rows:
+                    smoker, meat = replay_rows[i % len(replay_rows)]
+                else:
+                    smoker, meat = synthetic_sample(i * SAMPLE_PERIOD)
+                f.write(f"{start + i * SAMPLE_PERIOD},{smoker},{meat}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that dashboard memory stays flat over a long run')
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Dashboard base URL')
+    parser.add_argument('--days', type=int, default=3, help='Previous days of history to write')
+    parser.add_argument('--session-hours', type=float, default=10, help='Length of each previous day\'s session')
+    parser.add_argument('--replay', help='CSV session to replay for every day (default: synthetic)')
+    parser.add_argument('--clients', type=int, default=4, help='Number of concurrent clients')
+    parser.add_argument('--interval', type=float, default=2, help='Seconds between polls per client')
+    parser.add_argument('--duration', type=float, default=900, help='Test duration in seconds')
+    parser.add_argument('--warmup', type=float, default=120, help='Seconds before memory has to be flat')
+    parser.add_argument('--max-growth-mb', type=float, default=20, help='Allowed RSS growth after warm-up')
+    parser.add_argument('--server-cmd', help='Command used instead of "python app.py"')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    data_dir = tempfile.mkdtemp(prefix='pibq-soak-')
+    server, feeder = None, None
+    try:
+        replay_rows = load_replay(args.replay) if args.replay else None
+        write_previous_days(data_dir, args.days, args.session_hours, replay_rows)
+        feeder = DataFeeder(data_dir, 120, replay_rows)
+        feeder.start()
+        print(f"Wrote {args.days} days of history to {data_dir}, starting server...")
+        server = launch_server(data_dir, url, args.server_cmd)
+
+        dependencies = requests.get(url + '/_dash-dependencies', timeout=10).json()
+        callback = find_graph_callback(dependencies, 'interval-component.n_intervals')
+        layout_props = {}
+        collect_layout_props(requests.get(url + '/_dash-layout', timeout=10).json(), layout_props)
+        # previous_days=N covers today and the N-1 days before it
+        layout_props[('previous_days', 'value')] = args.days + 1
+
+        sampler = ResourceSampler(server.pid, period=5.0)
+        sampler.start()
+        stop_event = threading.Event()
+        results = []
+        clients = [Client(url, callback, layout_props, args.interval, 'interval-component.n_intervals',
+                          stop_event, results, 'identity') for _ in range(args.clients)]
+        for client in clients:
+            client.start()
+
+        print(f"Polling with {args.clients} clients every {args.interval:g} s for {args.duration:g} s")
+        time.sleep(args.duration)
+        stop_event.set()
+        for client in clients:
+            client.join(timeout=60)
+        sampler.stop()
+
+        metrics = requests.get(url + '/metrics', timeout=10).json()
+    finally:
+        if server:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if feeder:
+            feeder.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    errors = sum(1 for r in results if not r[2])
+    rss = np.array(sampler.rss_bytes) / 2**20
+    steady = rss[int(args.warmup / sampler.period):]
+    if len(steady) < 3:
+        print("Run too short to judge memory, increase --duration")
+        return 1
+
+    growth = steady[-1] - steady[0]
+    slope = np.polyfit(np.arange(len(steady)) * sampler.period / 3600, steady, 1)[0]
+    history = metrics.get('history', {})
+    print("\n=== PiBQ soak test results ===")
+    print(f"Requests:    {len(results)} ({errors} errors)")
+    print(f"Server RSS:  start {rss[0]:.0f} MiB | after warm-up {steady[0]:.0f} MiB | "
+          f"max {rss.max():.0f} MiB | end {rss[-1]:.0f} MiB")
+    print(f"Growth:      {growth:+.1f} MiB after warm-up ({slope:+.1f} MiB/hour)")
+    print(f"History:     {history.get('bytes', 0) / 2**20:.1f} of {history.get('budget_bytes', 0) / 2**20:.0f} MiB, "
+          f"{len(history.get('sessions', {}))} sessions, {history.get('counters')}")
+
+    if errors or growth > args.max_growth_mb:
+        print("FAIL")
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
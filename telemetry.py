@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in milliseconds (the last bucket catches everything above)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram: constant memory no matter how long the recorder runs."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th percentile, capped at the largest value seen
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= rank:
+                return min(self.buckets[i], round(self.max, 2)) if i < len(self.buckets) else round(self.max, 2)
+        return round(self.max, 2)
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': round(self.max, 2),
+            'buckets': {str(b): n for b, n in zip(self.buckets + ('inf',), self.counts)},
+        }
+
+
+class RecorderTelemetry:
+    """
+    Tracks how well the recorder keeps its cadence: per-probe I2C read latency, loop overruns
+    and gaps between samples. A background thread writes a status file every few seconds, so a
+    hung read shows up as a growing 'stalled_seconds' even while the main loop is blocked.
+    """
+
+    def __init__(self, status_file, period, gap_factor=2.0, write_interval=5.0, probes=('smoker', 'meat'),
+                 loop_period=None):
+        self.status_file = status_file
+        self.period = period
+        self.loop_period = loop_period or period  # Shorter than period when oversampling
+        self.gap_factor = gap_factor
+        self.write_interval = write_interval
+        self.lock = threading.Lock()
+
+        self.read_latency = {probe: Histogram() for probe in probes}
+        self.loop_time = Histogram()
+        self.interval = Histogram(buckets=tuple(b * period for b in (0.5, 0.9, 1.1, 1.5, 2, 5, 10, 60)))
+        self.counters = {'samples': 0, 'read_errors': 0, 'overruns': 0, 'gaps': 0}
+        self.gap_seconds = 0.0
+        self.last_sample = None
+        self.heartbeat = time.time()
+        self.started = time.time()
+
+        # Remember restarts across processes (systemd restarts us silently)
+        previous = read_status_file(status_file)
+        self.restarts = previous['restarts'] + 1 if previous else 0
+        self.downtime_before_start = (self.started - previous['last_sample']) if previous and previous.get('last_sample') else None
+
+    def record_read(self, probe, seconds, ok=True):
+        with self.lock:
+            self.read_latency[probe].observe(seconds * 1000)
+            if not ok:
+                self.counters['read_errors'] += 1
+
+    def record_sample(self, epoch):
+        with self.lock:
+            if self.last_sample is not None:
+                interval = epoch - self.last_sample
+                self.interval.observe(interval)
+                if interval > self.gap_factor * self.period:
+                    self.counters['gaps'] += 1
+                    self.gap_seconds += interval - self.period
+            self.last_sample = epoch
+            self.counters['samples'] += 1
+
+    def record_loop(self, seconds):
+        with self.lock:
+            self.loop_time.observe(seconds * 1000)
+            self.heartbeat = time.time()
+            if seconds > self.loop_period:
+                self.counters['overruns'] += 1
+
+    def status(self):
+        now = time.time()
+        with self.lock:
+            return {
+                'time': now,
+                'pid': os.getpid(),
+                'started': self.started,
+                'uptime_seconds': round(now - self.started),
+                'restarts': self.restarts,
+                'downtime_before_start': round(self.downtime_before_start) if self.downtime_before_start else None,
+                'period': self.period,
+                'loop_period': self.loop_period,
+                'last_sample': self.last_sample,
+                'stalled_seconds': round(now - self.heartbeat, 1),
+                'counters': dict(self.counters),
+                'gap_seconds': round(self.gap_seconds, 1),
+                'read_latency_ms': {probe: h.snapshot() for probe, h in self.read_latency.items()},
+                'loop_time_ms': self.loop_time.snapshot(),
+                'sample_interval_s': self.interval.snapshot(),
+            }
+
+    def write_status(self):
+        tmp_path = self.status_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.status(), f)
+        os.replace(tmp_path, self.status_file)
+
+    def start_writer(self):
+        def run():
+            while True:
+                try:
+                    self.write_status()
+                except OSError as e:
+                    print(f"Failed to write recorder status: {e}")
+                time.sleep(self.write_interval)
+        threading.Thread(target=run, daemon=True).start()
+
+
+def read_status_file(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
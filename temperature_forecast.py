@@ -1,4 +1,7 @@
+import threading
+
 import numpy as np
+from scipy import linalg, signal
 
 def exponential_smoothing_forecast(timestamps, temperatures, future_steps, future_dt=1.0):
     """
@@ -159,14 +162,192 @@ def forecast_temperature(timestamps, temperatures, future_steps, future_dt=1.0):
     """
     return adaptive_forecast(timestamps, temperatures, future_steps, future_dt)
 
-# Backward compatibility - keep the old function name
-def kalman_forecast_temperature(timestamps, temperatures, future_steps, future_dt=1.0):
+class KalmanTrendFilter:
+    """
+    Constant-velocity (level + trend) Kalman filter for one probe, with steady-state gains.
+
+    The model: temperature changes with a trend that itself drifts randomly (white acceleration
+    noise, °C/s²), and each reading adds measurement noise (°C). For evenly spaced samples the
+    Kalman gain converges to a fixed (alpha, beta) pair given by the ratio of the two (Kalata's
+    tracking index), so the filter is a linear recursive filter and the whole history runs
+    through scipy's lfilter in one O(n) pass. The filter state is kept between calls: on the
+    next refresh only the new samples are filtered. The actual measurement noise is estimated
+    from the filter's residuals, which scales the forecast variance and confidence bands.
+
+    Short gaps (missed reads) are bridged by predicting the state across them. After a long gap
+    the filter starts over with an unknown trend; the covariance of the fixed-gain filter is
+    tracked from there, so the bands are wide until the trend has been learned again.
+    """
+
+    def __init__(self, measurement_noise=0.5, acceleration_noise=1e-4, sample_period=1.1, band_sigmas=1.96,
+                 max_bridge_seconds=30, restart_trend_std=0.05):
+        # Tracking index and the matching steady-state gains
+        tracking_index = acceleration_noise * sample_period ** 2 / measurement_noise
+        r = (4 + tracking_index - np.sqrt(8 * tracking_index + tracking_index ** 2)) / 4
+        alpha = 1 - r ** 2
+        beta = 2 * (2 - alpha) - 4 * np.sqrt(1 - alpha)
+        self.alpha, self.beta = alpha, beta
+        self.period = sample_period
+        self.max_bridge = max_bridge_seconds  # A longer interval starts the filter over
+        self.band_sigmas = band_sigmas
+
+        # Per-sample recursion x_k = A x_(k-1) + K z_k as transfer functions z -> level and z -> trend
+        A = np.array([[1 - alpha, 1 - alpha], [-beta, 1 - beta]])
+        K = np.array([[alpha], [beta]])
+        num, self.den = signal.ss2tf(A, K, A, K)
+        self.num_level, self.num_trend = num
+
+        # Steady-state covariance in units of one sample and unit measurement noise (it scales with it)
+        F = np.array([[1.0, 1.0], [0.0, 1.0]])
+        H = np.array([[1.0, 0.0]])
+        self.Q = tracking_index ** 2 * np.array([[0.25, 0.5], [0.5, 1.0]])
+        P_prior = linalg.solve_discrete_are(F.T, H.T, self.Q, np.array([[1.0]]))
+        gain = P_prior @ H.T / (H @ P_prior @ H.T + 1.0)
+        self.P = (np.eye(2) - gain @ H) @ P_prior
+
+        # Covariance of the fixed-gain filter away from the steady state: P - self.P shrinks by A each step
+        self.A, self.KKt, self.update_matrix = A, K @ K.T, np.eye(2) - K @ H
+        self.P_restart = np.diag([1.0, (restart_trend_std * sample_period / measurement_noise) ** 2])
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.first_epoch = self.last_epoch = None
+        self.level = np.empty(0, dtype=np.float32)
+        self.trend = 0.0           # °C per sample, at the last sample
+        self.residuals = np.empty(0)
+        self.P_start, self.steps = self.P_restart, 0  # Covariance at the last restart or bridge, and samples since
+
+    @property
+    def nbytes(self):
+        return self.level.nbytes + self.residuals.nbytes
+
+    def _state(self, level, trend):
+        # lfilter state for the given level and trend, as if the readings had followed that ramp
+        history = [level, level - trend]
+        return (signal.lfiltic(self.num_level, self.den, history, history),
+                signal.lfiltic(self.num_trend, self.den, [trend, trend], history))
+
+    def _covariance(self):
+        decay = np.linalg.matrix_power(self.A, self.steps)
+        return decay @ (self.P_start - self.P) @ decay.T + self.P
+
+    def _propagate(self, P, steps):
+        # Covariance `steps` samples ahead without a reading: F^steps P F^steps' plus the process noise on the way
+        F = np.array([[1.0, steps], [0.0, 1.0]])
+        q = self.Q[1, 1]
+        return F @ P @ F.T + q * np.array([[steps ** 3 / 3 - steps / 12, steps ** 2 / 2], [steps ** 2 / 2, steps]])
+
+    def update(self, epochs, temperatures, keep_residuals=3600):
+        """
+        Filter a series (epoch seconds, temperatures) and return the smoothed level of every sample.
+        When the series extends the one of the previous call only the new samples are processed,
+        otherwise the filter starts over.
+
+        The gains assume one sample every sample_period. Missed samples are bridged; after a gap
+        longer than max_bridge_seconds (e.g. between sessions) the filter starts over. Isolated
+        rows, like the rollups of finished sessions in HistoryCache, are already medians and are
+        passed through as they are.
+        """
+        epochs = np.asarray(epochs, dtype=np.float64)
+        temperatures = np.asarray(temperatures, dtype=np.float64)
+        with self.lock:
+            n = self.count
+            if n and (len(epochs) < n or epochs[0] != self.first_epoch or epochs[n - 1] != self.last_epoch):
+                self.reset()
+                n = 0
+            new, new_epochs = temperatures[n:], epochs[n:]
+            if not len(new):
+                return self.level
+
+            # Runs of evenly spaced samples, each one started over (after a long gap) or bridged from the last
+            intervals = np.diff(np.concatenate(([self.last_epoch if n else -np.inf], new_epochs)))
+            steps = np.maximum(np.round(intervals / self.period), 1)
+            fresh = intervals > self.max_bridge
+            starts = np.flatnonzero(fresh | (steps > 1) | (np.arange(len(new)) == 0))
+            ends = np.append(starts[1:], len(new))
+
+            # Residuals stay NaN where there's no one-step prediction to compare with
+            level, trend, residuals = new.copy(), np.zeros(len(new)), np.full(len(new), np.nan)
+            last_level, last_trend = (self.level[-1], self.trend) if n else (np.nan, 0.0)
+            for start, end in zip(starts, ends):
+                k = 1 if fresh[start] else int(steps[start])
+                if fresh[start]:
+                    if end - start == 1 and end < len(new) and fresh[end]:
+                        continue  # Isolated row
+                    zi_level, zi_trend = self._state(new[start], 0.0)
+                    self.P_start, self.steps = self.P_restart, 0
+                else:
+                    # Predict across the missed samples, then carry on as if only one sample had passed
+                    zi_level, zi_trend = self._state(last_level + (k - 1) * last_trend, last_trend)
+                    if k > 1:
+                        P = self._propagate(self._covariance(), k)
+                        self.P_start = self.update_matrix @ P @ self.update_matrix.T + self.KKt
+                        self.steps = 0
+                    else:
+                        self.steps += 1
+                run = new[start:end]
+                level[start:end], _ = signal.lfilter(self.num_level, self.den, run, zi=zi_level)
+                trend[start:end], _ = signal.lfilter(self.num_trend, self.den, run, zi=zi_trend)
+                self.steps += end - start - 1
+                # Innovations: each reading minus the prediction from the step before
+                residuals[start + 1:end] = run[1:] - (level[start:end - 1] + trend[start:end - 1])
+                if not fresh[start] and k == 1:
+                    residuals[start] = run[0] - (last_level + last_trend)
+                last_level, last_trend = level[end - 1], trend[end - 1]
+
+            self.residuals = np.concatenate((self.residuals, residuals))[-keep_residuals:]
+            # Smoothed temperatures don't need more than float32, like the cached history
+            self.level = np.concatenate((self.level, level.astype(np.float32)))
+            self.trend = last_trend
+            self.count = len(epochs)
+            self.first_epoch, self.last_epoch = epochs[0], epochs[-1]
+            return self.level
+
+    def trend_per_second(self):
+        return self.trend / self.period
+
+    def forecast(self, horizon_seconds, recent=300):
+        """
+        Predictions and confidence bands at the given seconds after the last sample. The
+        measurement noise is estimated from the last `recent` residuals.
+        """
+        horizon_seconds = np.asarray(horizon_seconds, dtype=np.float64)
+        with self.lock:
+            if not self.count:
+                return np.array([]), np.array([]), np.array([])
+            residuals = self.residuals[-recent:]
+            residuals = residuals[~np.isnan(residuals)]
+            # Innovation variance is R / (1 - alpha) in the steady state
+            noise_variance = (1 - self.alpha) * np.mean(residuals ** 2) if len(residuals) > 1 else 1.0
+            level, trend, P = float(self.level[-1]), self.trend, self._covariance()
+
+        h = horizon_seconds / self.period  # Horizon in samples
+        predictions = level + trend * h
+
+        # Level variance h steps ahead, as in _propagate
+        variance = P[0, 0] + 2 * h * P[0, 1] + h ** 2 * P[1, 1] + self.Q[1, 1] * (h ** 3 / 3 - h / 12)
+        width = self.band_sigmas * np.sqrt(np.maximum(variance, 0) * noise_variance)
+        return predictions, predictions + width, predictions - width
+
+
+def kalman_forecast_temperature(timestamps, temperatures, future_steps, future_dt=1.0,
+                                measurement_noise=0.5, acceleration_noise=1e-4):
     """
-    Legacy function name for backward compatibility.
+    Kalman filter forecast with the same interface as forecast_temperature().
+    For a filter that keeps its state between refreshes use KalmanTrendFilter directly.
     """
-    return forecast_temperature(timestamps, temperatures, future_steps, future_dt)
+    if len(temperatures) < 3:
+        return simple_trend_forecast(timestamps, temperatures, future_steps, future_dt)
+    period = np.median(np.diff(timestamps))
+    kalman = KalmanTrendFilter(measurement_noise, acceleration_noise, period if period > 0 else 1.0)
+    kalman.update(timestamps, temperatures)
+    return kalman.forecast(np.arange(1, future_steps + 1) * future_dt)
 
 # Alternative forecasting methods you can use directly:
+# - KalmanTrendFilter / kalman_forecast_temperature() - Smoothing and forecast in one pass (dashboard default)
 # - exponential_smoothing_forecast() - Balanced approach for most BBQ scenarios
 # - moving_average_forecast() - Best for very stable temperatures  
 # - simple_trend_forecast() - Basic linear trend (fallback)
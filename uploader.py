@@ -0,0 +1,114 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+
+class Uploader:
+    """
+    Pushes recorded rows to a PiBQ dashboard's /ingest endpoint (see ingest.py).
+
+    Rows wait in a bounded buffer and are sent in batches from a background thread over one
+    keep-alive connection, so the recorder loop never waits on the network. When the dashboard
+    is unreachable or busy (503) the thread backs off exponentially, honouring Retry-After, and
+    the buffer keeps the newest rows; the oldest are dropped only once it is full.
+    The local CSV is always written, so nothing is lost on the recording Pi itself.
+    """
+
+    def __init__(self, url, device, session, batch_size=50, flush_interval=5.0, max_buffer_rows=20000,
+                 timeout=10.0, max_backoff=60.0, token=None):
+        self.url = f"{url.rstrip('/')}/ingest/{device}"
+        self.session_name = session
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.buffer = deque(maxlen=max_buffer_rows)
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.http = requests.Session()
+        if token:
+            self.http.headers['X-PiBQ-Token'] = token
+        self.counters = {'sent': 0, 'dropped': 0, 'failures': 0}
+        self.closing = False
+        self.thread = None
+
+    def add(self, row):
+        # JSON has no NaN (e.g. a substituted outlier); send null, which ingest writes back as nan
+        row = [None if isinstance(v, float) and not math.isfinite(v) else v for v in row]
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.counters['dropped'] += 1
+            self.buffer.append(row)
+            if len(self.buffer) >= self.batch_size:
+                self.wakeup.set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def close(self, timeout=5.0):
+        # Try to send what's still buffered before the recorder exits
+        self.closing = True
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _send(self, rows):
+        """Returns ('sent' | 'rejected' | 'retry', seconds to wait before retrying or None)."""
+        try:
+            response = self.http.post(self.url, json={'session': self.session_name, 'rows': rows},
+                                      timeout=self.timeout)
+        except requests.exceptions.InvalidJSONError as e:
+            # Can't be encoded, so retrying would block the buffer forever
+            print(f"Dropping samples that can't be sent: {e}")
+            return 'rejected', None
+        except requests.RequestException as e:
+            print(f"Pushing samples failed: {e}")
+            return 'retry', None
+        if response.status_code == 200:
+            return 'sent', None
+        if response.status_code in (400, 403):
+            # Won't get better by retrying; drop the batch instead of blocking the buffer forever
+            print(f"Dashboard rejected pushed samples ({response.status_code}): {response.text[:200]}")
+            return 'rejected', None
+        try:
+            return 'retry', float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return 'retry', None
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            while True:
+                with self.lock:
+                    rows = [self.buffer[i] for i in range(min(self.batch_size, len(self.buffer)))]
+                if not rows:
+                    break
+
+                result, retry_after = self._send(rows)
+                if result == 'retry':
+                    self.counters['failures'] += 1
+                    delay = retry_after or backoff
+                    backoff = min(backoff * 2, self.max_backoff)
+                    time.sleep(delay + random.uniform(0, delay / 4))  # Jitter so units don't retry in lockstep
+                    break
+
+                backoff = 1.0
+                with self.lock:
+                    # The batch is still at the front unless a full buffer pushed some of it out meanwhile
+                    for row in rows:
+                        if self.buffer and self.buffer[0] is row:
+                            self.buffer.popleft()
+                    self.counters['sent' if result == 'sent' else 'dropped'] += len(rows)
+            if self.closing:
+                return
+
+    def stats(self):
+        with self.lock:
+            return {'buffered': len(self.buffer), **self.counters}